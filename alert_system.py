@@ -1,17 +1,199 @@
 import smtplib
-import json
 import logging
+import functools
+import queue
+import threading
+import time
+import weakref
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from dataclasses import dataclass
+from psycopg2.extras import RealDictCursor, Json, execute_batch
+from psycopg2.pool import ThreadedConnectionPool
+from dataclasses import dataclass, replace
 
 # ログ設定
 logger = logging.getLogger(__name__)
 
+# コネクションプールの最小・最大接続数
+# 条件種別ごとの並列評価で使う接続を保持し、接続ごとのプリペアドステートメントを使い回す
+DB_POOL_MIN_CONNECTIONS = 3
+DB_POOL_MAX_CONNECTIONS = 8
+
+# ルール評価結果をキャッシュする期間（秒）
+RULE_CACHE_TTL_SECONDS = 300
+
+# 同じルールのアラートを再通知しない期間（秒）。評価対象の「過去1時間」に合わせる
+ALERT_COOLDOWN_SECONDS = 3600
+
+# 当月に加えて先に作成しておくアラートログの月別パーティション数
+# 起動時と、月が変わって最初にログを書き込む際に作成する
+ALERT_LOG_PARTITION_MONTHS_AHEAD = 3
+
+# 全アラートルールを1回の往復で評価するプリペアドステートメント
+# ルールはJSON配列で受け取り、条件種別ごとのCTEで集計した結果をrule_id付きで返す
+# 閾値判定もSQL側で行い、感情・言及数ルールは閾値を超えた中で最も値の大きい1行だけを返す
+# 各接続で一度だけPREPAREし、以降はEXECUTEで解析・実行計画を再利用する
+# キーワード検出は直近1時間の応答をtimestamp索引で絞り込み、応答・質問テキストをILIKE ANYで順に照合する（最新5件まで）
+_RULE_EVALUATION_STATEMENT = "alert_rule_evaluation"
+_PREPARE_RULE_EVALUATION_SQL = f"""
+    PREPARE {_RULE_EVALUATION_STATEMENT}(jsonb) AS
+    WITH rules AS (
+        SELECT *
+        FROM jsonb_to_recordset($1) AS r(
+            rule_id INTEGER,
+            condition_type TEXT,
+            threshold FLOAT8,
+            brand_keywords TEXT[],
+            ai_sources TEXT[],
+            keyword_patterns TEXT[]
+        )
+    ),
+    sentiment_agg AS (
+        SELECT DISTINCT ON (r.rule_id)
+            r.rule_id,
+            ar.ai_name,
+            COUNT(*) as total_count,
+            SUM(CASE WHEN ar.response_sentiment = 'negative' THEN 1 ELSE 0 END) as negative_count
+        FROM rules r
+        JOIN ai_responses ar ON ar.ai_name = ANY(r.ai_sources)
+        WHERE r.condition_type = 'sentiment_threshold'
+        AND ar.timestamp >= NOW() - INTERVAL '1 hour'
+        GROUP BY r.rule_id, r.threshold, ar.ai_name
+        HAVING SUM(CASE WHEN ar.response_sentiment = 'negative' THEN 1 ELSE 0 END)::float8 / COUNT(*) >= r.threshold
+        ORDER BY r.rule_id, SUM(CASE WHEN ar.response_sentiment = 'negative' THEN 1 ELSE 0 END)::float8 / COUNT(*) DESC
+    ),
+    mention_agg AS (
+        SELECT DISTINCT ON (r.rule_id)
+            r.rule_id,
+            bm.brand_name,
+            ar.ai_name,
+            COUNT(*) as mention_count
+        FROM rules r
+        JOIN ai_responses ar ON ar.ai_name = ANY(r.ai_sources)
+        JOIN brand_mentions bm ON bm.ai_response_id = ar.id
+        WHERE r.condition_type = 'mention_count'
+        AND ar.timestamp >= NOW() - INTERVAL '1 hour'
+        AND bm.brand_name = ANY(r.brand_keywords)
+        GROUP BY r.rule_id, r.threshold, bm.brand_name, ar.ai_name
+        HAVING COUNT(*) >= r.threshold
+        ORDER BY r.rule_id, COUNT(*) DESC
+    ),
+    keyword_hits AS (
+        SELECT 
+            r.rule_id,
+            COUNT(hits.timestamp) as hit_count,
+            (ARRAY_AGG(hits.response_text ORDER BY hits.timestamp DESC))[1] as latest_response
+        FROM rules r
+        LEFT JOIN LATERAL (
+            SELECT ar.response_text, ar.timestamp
+            FROM ai_responses ar
+            WHERE ar.timestamp >= NOW() - INTERVAL '1 hour'
+            AND ar.ai_name = ANY(r.ai_sources)
+            AND (ar.response_text ILIKE ANY(r.keyword_patterns) OR ar.query_text ILIKE ANY(r.keyword_patterns))
+            ORDER BY ar.timestamp DESC
+            LIMIT 5
+        ) hits ON true
+        WHERE r.condition_type = 'keyword_detection'
+        GROUP BY r.rule_id
+    )
+    SELECT rule_id, ai_name, NULL as brand_name, total_count, negative_count,
+           NULL::bigint as mention_count, NULL::bigint as hit_count, NULL as latest_response
+    FROM sentiment_agg
+    UNION ALL
+    SELECT rule_id, ai_name, brand_name, NULL, NULL, mention_count, NULL, NULL
+    FROM mention_agg
+    UNION ALL
+    SELECT rule_id, NULL, NULL, NULL, NULL, NULL, hit_count, latest_response
+    FROM keyword_hits
+"""
+
+# 重要度ごとのメールヘッダー色
+_SEVERITY_COLORS = {
+    'low': '#28a745',
+    'medium': '#ffc107',
+    'high': '#fd7e14',
+    'critical': '#dc3545'
+}
+
+# メール本文の固定部分。アラートごとに差し込むのは可変部分のみ
+# 発生時刻の前後でテンプレートを分け、時刻以外の部分をキャッシュできるようにしている
+_HTML_HEAD_TEMPLATE = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body {{ font-family: Arial, sans-serif; margin: 20px; }}
+                .header {{ background-color: {color}; color: white; padding: 15px; border-radius: 5px; }}
+                .content {{ padding: 20px; border: 1px solid #ddd; border-radius: 5px; margin-top: 10px; }}
+                .data-table {{ width: 100%; border-collapse: collapse; margin-top: 15px; }}
+                .data-table th, .data-table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+                .data-table th {{ background-color: #f2f2f2; }}
+                .timestamp {{ color: #666; font-size: 0.9em; }}
+            </style>
+        </head>
+        <body>
+            <div class="header">
+                <h2>🚨 AI監視アラート</h2>
+                <h3>{rule_name}</h3>
+                <p class="timestamp">発生時刻: """
+
+_HTML_BODY_TEMPLATE = """</p>
+            </div>
+            
+            <div class="content">
+                <h4>アラート内容</h4>
+                <p>{message}</p>
+                
+                <h4>重要度</h4>
+                <p style="color: {color}; font-weight: bold;">{severity}</p>
+                
+                <h4>詳細データ</h4>
+                <table class="data-table">
+        """
+
+_HTML_TAIL = """
+                </table>
+                
+                <hr style="margin: 20px 0;">
+                <p style="font-size: 0.9em; color: #666;">
+                    このアラートは AI Brand Monitoring System により自動生成されました。<br>
+                    詳細な分析結果はダッシュボードでご確認ください。
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+
+_TEXT_HEAD_TEMPLATE = """
+AI監視アラート: {rule_name}
+
+発生時刻: """
+
+_TEXT_BODY_TEMPLATE = """
+重要度: {severity}
+
+アラート内容:
+{message}
+
+詳細データ:
+"""
+
+_TEXT_TAIL = """
+---
+このアラートは AI Brand Monitoring System により自動生成されました。
+詳細な分析結果はダッシュボードでご確認ください。
+"""
+
+def _escape_like(text: str) -> str:
+    """LIKEパターンの特殊文字をエスケープ"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
 @dataclass
 class AlertRule:
     """アラートルールの定義"""
@@ -22,6 +204,7 @@ class AlertRule:
     ai_sources: List[str]
     email_recipients: List[str]
     is_active: bool = True
+    cooldown_until: float = 0.0  # 再通知を抑止する期限（time.monotonic()基準）
 
 @dataclass
 class Alert:
@@ -37,6 +220,41 @@ class EmailNotifier:
     
     def __init__(self, smtp_config: Dict[str, str]):
         self.smtp_config = smtp_config
+        self._server: Optional[smtplib.SMTP] = None
+    
+    def __enter__(self):
+        """SMTPセッションを開き、コンテキスト内の送信で使い回す"""
+        try:
+            self._server = self._connect()
+        except Exception as e:
+            # 接続できない場合は送信ごとの接続にフォールバック
+            logger.error(f"Failed to open SMTP session: {e}")
+            self._server = None
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        """SMTPセッションを閉じる"""
+        if self._server:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+    
+    def _connect(self) -> smtplib.SMTP:
+        """SMTPサーバーに接続してログイン"""
+        server = smtplib.SMTP(self.smtp_config['smtp_server'], self.smtp_config['smtp_port'])
+        try:
+            if self.smtp_config.get('use_tls', True):
+                server.starttls()
+            
+            if self.smtp_config.get('username') and self.smtp_config.get('password'):
+                server.login(self.smtp_config['username'], self.smtp_config['password'])
+        except Exception:
+            server.close()
+            raise
+        
+        return server
     
     def send_alert_email(self, recipients: List[str], alert: Alert):
         """アラートメールを送信"""
@@ -60,15 +278,17 @@ class EmailNotifier:
             msg.attach(text_part)
             msg.attach(html_part)
             
-            # SMTPサーバーに接続して送信
-            with smtplib.SMTP(self.smtp_config['smtp_server'], self.smtp_config['smtp_port']) as server:
-                if self.smtp_config.get('use_tls', True):
-                    server.starttls()
-                
-                if self.smtp_config.get('username') and self.smtp_config.get('password'):
-                    server.login(self.smtp_config['username'], self.smtp_config['password'])
-                
-                server.send_message(msg)
+            # セッションが開いていれば使い回し、なければ都度接続して送信
+            if self._server:
+                try:
+                    self._server.send_message(msg)
+                except smtplib.SMTPServerDisconnected:
+                    # サーバー側でセッションが切れていれば再接続して送り直す
+                    self._server = self._connect()
+                    self._server.send_message(msg)
+            else:
+                with self._connect() as server:
+                    server.send_message(msg)
             
             logger.info(f"Alert email sent to {recipients} for rule: {alert.rule_name}")
             
@@ -77,99 +297,177 @@ class EmailNotifier:
     
     def _create_email_html(self, alert: Alert) -> str:
         """HTMLメール本文を作成"""
-        severity_colors = {
-            'low': '#28a745',
-            'medium': '#ffc107',
-            'high': '#fd7e14',
-            'critical': '#dc3545'
-        }
-        
-        color = severity_colors.get(alert.severity, '#6c757d')
-        
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                .header {{ background-color: {color}; color: white; padding: 15px; border-radius: 5px; }}
-                .content {{ padding: 20px; border: 1px solid #ddd; border-radius: 5px; margin-top: 10px; }}
-                .data-table {{ width: 100%; border-collapse: collapse; margin-top: 15px; }}
-                .data-table th, .data-table td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
-                .data-table th {{ background-color: #f2f2f2; }}
-                .timestamp {{ color: #666; font-size: 0.9em; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h2>🚨 AI監視アラート</h2>
-                <h3>{alert.rule_name}</h3>
-                <p class="timestamp">発生時刻: {alert.timestamp.strftime('%Y-%m-%d %H:%M:%S')}</p>
-            </div>
-            
-            <div class="content">
-                <h4>アラート内容</h4>
-                <p>{alert.message}</p>
-                
-                <h4>重要度</h4>
-                <p style="color: {color}; font-weight: bold;">{alert.severity.upper()}</p>
-                
-                <h4>詳細データ</h4>
-                <table class="data-table">
-        """
-        
-        # データテーブルを追加
-        for key, value in alert.data.items():
-            html += f"<tr><th>{key}</th><td>{value}</td></tr>"
-        
-        html += """
-                </table>
-                
-                <hr style="margin: 20px 0;">
-                <p style="font-size: 0.9em; color: #666;">
-                    このアラートは AI Brand Monitoring System により自動生成されました。<br>
-                    詳細な分析結果はダッシュボードでご確認ください。
-                </p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html
+        head, body = self._render_cached(self._render_html, alert)
+        return head + alert.timestamp.strftime('%Y-%m-%d %H:%M:%S') + body
     
     def _create_email_text(self, alert: Alert) -> str:
         """テキストメール本文を作成"""
-        text = f"""
-AI監視アラート: {alert.rule_name}
-
-発生時刻: {alert.timestamp.strftime('%Y-%m-%d %H:%M:%S')}
-重要度: {alert.severity.upper()}
-
-アラート内容:
-{alert.message}
-
-詳細データ:
-"""
-        
-        for key, value in alert.data.items():
-            text += f"- {key}: {value}\n"
+        head, body = self._render_cached(self._render_text, alert)
+        return head + alert.timestamp.strftime('%Y-%m-%d %H:%M:%S') + body
+    
+    @staticmethod
+    def _render_cached(render, alert: Alert) -> Tuple[str, str]:
+        """発生時刻以外の部分をアラート内容ごとにキャッシュして描画"""
+        # 行の順序を保つため、dataはソートせず挿入順のまま固定する
+        # 値は表示する文字列に変換してからキーにする（1・1.0・Trueは等価でハッシュも同じため、値のままだと取り違える）
+        data_items = tuple((f"{key}", f"{value}") for key, value in alert.data.items())
+        return render(alert.rule_name, alert.severity, alert.message, data_items)
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def _render_html(rule_name: str, severity: str, message: str, data_items: Tuple) -> Tuple[str, str]:
+        """HTMLメール本文の発生時刻より前と後を作成"""
+        color = _SEVERITY_COLORS.get(severity, '#6c757d')
         
-        text += """
----
-このアラートは AI Brand Monitoring System により自動生成されました。
-詳細な分析結果はダッシュボードでご確認ください。
-"""
+        # データテーブルの行をまとめて生成
+        rows_html = "".join(f"<tr><th>{key}</th><td>{value}</td></tr>" for key, value in data_items)
         
-        return text
+        head = _HTML_HEAD_TEMPLATE.format_map({'color': color, 'rule_name': rule_name})
+        body = _HTML_BODY_TEMPLATE.format_map({
+            'color': color,
+            'message': message,
+            'severity': severity.upper()
+        }) + rows_html + _HTML_TAIL
+        return head, body
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=128)
+    def _render_text(rule_name: str, severity: str, message: str, data_items: Tuple) -> Tuple[str, str]:
+        """テキストメール本文の発生時刻より前と後を作成"""
+        head = _TEXT_HEAD_TEMPLATE.format_map({'rule_name': rule_name})
+        lines = [_TEXT_BODY_TEMPLATE.format_map({'severity': severity.upper(), 'message': message})]
+        lines.extend(f"- {key}: {value}\n" for key, value in data_items)
+        lines.append(_TEXT_TAIL)
+        return head, "".join(lines)
 
 class AlertEngine:
     """アラートエンジンのメインクラス"""
     
     def __init__(self, db_config: Dict[str, str], smtp_config: Dict[str, str]):
         self.db_config = db_config
+        self.pool = ThreadedConnectionPool(DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, **db_config)
         self.email_notifier = EmailNotifier(smtp_config)
         self.alert_rules = self._load_default_rules()
+        self._rule_cache: Dict[str, Tuple[float, Optional[Alert]]] = {}
+        self._prepared_connections = weakref.WeakSet()
+        # alert_logsがパーティションテーブルか、どの月（ローカル時刻）までパーティションを確認済みか
+        self._alert_logs_partitioned = False
+        self._partitions_checked_month: Optional[date] = None
+        self._ensure_schema()
+        
+        # メール送信はワーカースレッドに任せ、チェック処理をSMTPの待ち時間から切り離す
+        self._mail_queue: queue.Queue = queue.Queue()
+        self._mail_worker = threading.Thread(target=self._mail_worker_loop, name="alert-mailer", daemon=True)
+        self._mail_worker.start()
+    
+    @contextmanager
+    def _conn(self):
+        """プールから接続を借りてトランザクション終了後に返却"""
+        conn = self.pool.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            # サーバー側で切断された接続はプールに戻さず破棄
+            self.pool.putconn(conn, close=bool(conn.closed))
+    
+    def _ensure_schema(self):
+        """アラートログテーブルと月別パーティションが存在しない場合は作成（起動時に1回だけ実行）"""
+        try:
+            with self._conn() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS alert_logs (
+                            id SERIAL,
+                            rule_name VARCHAR(255) NOT NULL,
+                            message TEXT NOT NULL,
+                            severity VARCHAR(50) NOT NULL,
+                            data JSONB,
+                            timestamp TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                            PRIMARY KEY (id, timestamp)
+                        ) PARTITION BY RANGE (timestamp)
+                    """)
+                    
+                    # 以前のバージョンで作成された非パーティションテーブルはそのまま使う
+                    cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'alert_logs'::regclass")
+                    if cursor.fetchone()[0] != 'p':
+                        logger.warning("alert_logs is not a partitioned table; skipping partition creation")
+                        return
+                    
+                    self._alert_logs_partitioned = True
+        except Exception as e:
+            logger.error(f"Failed to create alert_logs table: {e}")
+            return
+        
+        self._ensure_partitions()
+    
+    def _ensure_partitions(self):
+        """DBの現在月から指定月数分の月別パーティションを作成（1パーティションずつ別トランザクションで実行）"""
+        if not self._alert_logs_partitioned:
+            return
+        
+        try:
+            with self._conn() as conn:
+                with conn.cursor() as cursor:
+                    # パーティション境界はDBのタイムゾーンで解釈されるため、月もDB側で求める
+                    cursor.execute("SELECT date_trunc('month', CURRENT_TIMESTAMP)::date")
+                    month_start = cursor.fetchone()[0]
+        except Exception as e:
+            logger.error(f"Failed to create alert_logs partitions: {e}")
+            return
+        
+        all_created = True
+        for _ in range(ALERT_LOG_PARTITION_MONTHS_AHEAD + 1):
+            # 1つの失敗で他の月の作成まで取り消されないよう、文ごとにコミット
+            try:
+                with self._conn() as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(self._build_partition_ddl(month_start))
+            except Exception as e:
+                all_created = False
+                logger.error(f"Failed to create alert_logs partition for {month_start:%Y-%m}: {e}")
+            month_start = (month_start + timedelta(days=32)).replace(day=1)
+        
+        # 失敗した場合は次回のログ書き込み時に再試行する
+        if all_created:
+            self._partitions_checked_month = datetime.now().date().replace(day=1)
+    
+    @staticmethod
+    def _build_partition_ddl(month_start: date) -> str:
+        """指定月の月別パーティションのDDLを作成"""
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        return (
+            f"CREATE TABLE IF NOT EXISTS alert_logs_{month_start:%Y%m} PARTITION OF alert_logs "
+            f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{next_month.isoformat()}')"
+        )
+    
+    def _mail_worker_loop(self):
+        """キューに積まれたアラートメールを送信するワーカー"""
+        stopping = False
+        while not stopping:
+            # 溜まっている分はまとめて取り出し、1つのSMTPセッションで送信
+            batch = [self._mail_queue.get()]
+            while True:
+                try:
+                    batch.append(self._mail_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stopping = None in batch
+            jobs = [item for item in batch if item is not None]
+            if jobs:
+                with self.email_notifier:
+                    for recipients, alert in jobs:
+                        self.email_notifier.send_alert_email(recipients, alert)
+            
+            for _ in batch:
+                self._mail_queue.task_done()
+    
+    def close(self):
+        """未送信のアラートメールを送り切ってからプール内の全接続を閉じる"""
+        self._mail_queue.put(None)
+        self._mail_worker.join()
+        self.pool.closeall()
     
     def _load_default_rules(self) -> List[AlertRule]:
         """デフォルトのアラートルールを読み込み"""
@@ -203,43 +501,7 @@ class AlertEngine:
     def check_sentiment_threshold(self, rule: AlertRule) -> Optional[Alert]:
         """感情閾値チェック"""
         try:
-            with psycopg2.connect(**self.db_config) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # 過去1時間のネガティブ感情応答を取得
-                    cursor.execute("""
-                        SELECT 
-                            COUNT(*) as total_count,
-                            SUM(CASE WHEN response_sentiment = 'negative' THEN 1 ELSE 0 END) as negative_count,
-                            ai_name
-                        FROM ai_responses 
-                        WHERE timestamp >= NOW() - INTERVAL '1 hour'
-                        AND ai_name = ANY(%s)
-                        GROUP BY ai_name
-                    """, (rule.ai_sources,))
-                    
-                    results = cursor.fetchall()
-                    
-                    for result in results:
-                        if result['total_count'] > 0:
-                            negative_ratio = result['negative_count'] / result['total_count']
-                            
-                            if negative_ratio >= rule.threshold:
-                                return Alert(
-                                    rule_name=rule.name,
-                                    message=f"{result['ai_name']}でネガティブ感情の応答が急増しています（{negative_ratio:.1%}）",
-                                    severity="high" if negative_ratio >= 0.8 else "medium",
-                                    timestamp=datetime.now(),
-                                    data={
-                                        "AI名": result['ai_name'],
-                                        "総応答数": result['total_count'],
-                                        "ネガティブ応答数": result['negative_count'],
-                                        "ネガティブ比率": f"{negative_ratio:.1%}",
-                                        "期間": "過去1時間"
-                                    }
-                                )
-            
-            return None
-            
+            return self._evaluate_rules([replace(rule, condition_type="sentiment_threshold")])[0]
         except Exception as e:
             logger.error(f"Sentiment threshold check error: {e}")
             return None
@@ -247,41 +509,7 @@ class AlertEngine:
     def check_mention_count(self, rule: AlertRule) -> Optional[Alert]:
         """言及数チェック"""
         try:
-            with psycopg2.connect(**self.db_config) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # 過去1時間のブランド言及数を取得
-                    cursor.execute("""
-                        SELECT 
-                            bm.brand_name,
-                            COUNT(*) as mention_count,
-                            ar.ai_name
-                        FROM brand_mentions bm
-                        JOIN ai_responses ar ON bm.ai_response_id = ar.id
-                        WHERE ar.timestamp >= NOW() - INTERVAL '1 hour'
-                        AND bm.brand_name = ANY(%s)
-                        AND ar.ai_name = ANY(%s)
-                        GROUP BY bm.brand_name, ar.ai_name
-                    """, (rule.brand_keywords, rule.ai_sources))
-                    
-                    results = cursor.fetchall()
-                    
-                    for result in results:
-                        if result['mention_count'] >= rule.threshold:
-                            return Alert(
-                                rule_name=rule.name,
-                                message=f"{result['brand_name']}の言及数が急増しています（{result['ai_name']}で{result['mention_count']}件）",
-                                severity="medium" if result['mention_count'] < 20 else "high",
-                                timestamp=datetime.now(),
-                                data={
-                                    "ブランド名": result['brand_name'],
-                                    "AI名": result['ai_name'],
-                                    "言及数": result['mention_count'],
-                                    "期間": "過去1時間"
-                                }
-                            )
-            
-            return None
-            
+            return self._evaluate_rules([replace(rule, condition_type="mention_count")])[0]
         except Exception as e:
             logger.error(f"Mention count check error: {e}")
             return None
@@ -289,98 +517,193 @@ class AlertEngine:
     def check_keyword_detection(self, rule: AlertRule) -> Optional[Alert]:
         """キーワード検出チェック"""
         try:
-            with psycopg2.connect(**self.db_config) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # 過去1時間で特定キーワードを含む応答を検索
-                    keyword_pattern = '|'.join(rule.brand_keywords)
-                    
-                    cursor.execute("""
-                        SELECT 
-                            ar.ai_name,
-                            ar.query_text,
-                            ar.response_text,
-                            ar.timestamp
-                        FROM ai_responses ar
-                        WHERE ar.timestamp >= NOW() - INTERVAL '1 hour'
-                        AND ar.ai_name = ANY(%s)
-                        AND (ar.response_text ~* %s OR ar.query_text ~* %s)
-                        ORDER BY ar.timestamp DESC
-                        LIMIT 5
-                    """, (rule.ai_sources, keyword_pattern, keyword_pattern))
-                    
-                    results = cursor.fetchall()
-                    
-                    if len(results) >= rule.threshold:
-                        return Alert(
-                            rule_name=rule.name,
-                            message=f"特定キーワード（{', '.join(rule.brand_keywords)}）を含む応答が検出されました",
-                            severity="low",
-                            timestamp=datetime.now(),
-                            data={
-                                "検出件数": len(results),
-                                "キーワード": ', '.join(rule.brand_keywords),
-                                "最新の応答": results[0]['response_text'][:200] + "..." if results else "",
-                                "期間": "過去1時間"
-                            }
-                        )
-            
-            return None
-            
+            return self._evaluate_rules([replace(rule, condition_type="keyword_detection")])[0]
         except Exception as e:
             logger.error(f"Keyword detection check error: {e}")
             return None
     
+    def _evaluate_rules(self, rules: List[AlertRule]) -> List[Optional[Alert]]:
+        """複数のルールを1回のクエリで評価し、ルール順にアラートを返す"""
+        if not rules:
+            return []
+        
+        payload = [
+            {
+                'rule_id': rule_id,
+                'condition_type': rule.condition_type,
+                'threshold': rule.threshold,
+                'brand_keywords': rule.brand_keywords,
+                'ai_sources': rule.ai_sources,
+                'keyword_patterns': [f"%{_escape_like(keyword)}%" for keyword in rule.brand_keywords]
+            }
+            for rule_id, rule in enumerate(rules)
+        ]
+        
+        with self._conn() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                if conn not in self._prepared_connections:
+                    cursor.execute(_PREPARE_RULE_EVALUATION_SQL)
+                    self._prepared_connections.add(conn)
+                
+                cursor.execute(f"EXECUTE {_RULE_EVALUATION_STATEMENT}(%s)", (Json(payload),))
+                results = cursor.fetchall()
+        
+        # rule_idごとに結果を振り分け
+        results_by_rule = [[] for _ in rules]
+        for result in results:
+            results_by_rule[result['rule_id']].append(result)
+        
+        return [self._build_alert(rule, rule_results) for rule, rule_results in zip(rules, results_by_rule)]
+    
+    def _build_alert(self, rule: AlertRule, results: List[Dict]) -> Optional[Alert]:
+        """条件種別に応じて評価結果からアラートを作成"""
+        if rule.condition_type == "sentiment_threshold":
+            return self._build_sentiment_alert(rule, results)
+        elif rule.condition_type == "mention_count":
+            return self._build_mention_alert(rule, results)
+        elif rule.condition_type == "keyword_detection":
+            return self._build_keyword_alert(rule, results)
+        
+        return None
+    
+    def _build_sentiment_alert(self, rule: AlertRule, results: List[Dict]) -> Optional[Alert]:
+        """閾値を超えたAIの感情集計から感情閾値アラートを作成"""
+        if not results:
+            return None
+        
+        result = results[0]
+        negative_ratio = result['negative_count'] / result['total_count']
+        
+        return Alert(
+            rule_name=rule.name,
+            message=f"{result['ai_name']}でネガティブ感情の応答が急増しています（{negative_ratio:.1%}）",
+            severity="high" if negative_ratio >= 0.8 else "medium",
+            timestamp=datetime.now(),
+            data={
+                "AI名": result['ai_name'],
+                "総応答数": result['total_count'],
+                "ネガティブ応答数": result['negative_count'],
+                "ネガティブ比率": f"{negative_ratio:.1%}",
+                "期間": "過去1時間"
+            }
+        )
+    
+    def _build_mention_alert(self, rule: AlertRule, results: List[Dict]) -> Optional[Alert]:
+        """閾値を超えたブランド・AI別の言及数から言及数アラートを作成"""
+        if not results:
+            return None
+        
+        result = results[0]
+        
+        return Alert(
+            rule_name=rule.name,
+            message=f"{result['brand_name']}の言及数が急増しています（{result['ai_name']}で{result['mention_count']}件）",
+            severity="medium" if result['mention_count'] < 20 else "high",
+            timestamp=datetime.now(),
+            data={
+                "ブランド名": result['brand_name'],
+                "AI名": result['ai_name'],
+                "言及数": result['mention_count'],
+                "期間": "過去1時間"
+            }
+        )
+    
+    def _build_keyword_alert(self, rule: AlertRule, results: List[Dict]) -> Optional[Alert]:
+        """キーワード一致件数からキーワード検出アラートを作成"""
+        if not results:
+            return None
+        
+        result = results[0]
+        if result['hit_count'] >= rule.threshold:
+            return Alert(
+                rule_name=rule.name,
+                message=f"特定キーワード（{', '.join(rule.brand_keywords)}）を含む応答が検出されました",
+                severity="low",
+                timestamp=datetime.now(),
+                data={
+                    "検出件数": result['hit_count'],
+                    "キーワード": ', '.join(rule.brand_keywords),
+                    "最新の応答": result['latest_response'][:200] + "..." if result['hit_count'] else "",
+                    "期間": "過去1時間"
+                }
+            )
+        
+        return None
+    
     def run_alert_checks(self):
         """全てのアラートルールをチェック"""
         logger.info("Starting alert checks...")
         
-        for rule in self.alert_rules:
-            if not rule.is_active:
+        now = time.monotonic()
+        active_rules = [rule for rule in self.alert_rules if rule.is_active]
+        
+        # キャッシュが有効なルールはDBへの問い合わせを省略
+        alerts = {}
+        pending_rules = []
+        for rule in active_rules:
+            cached = self._rule_cache.get(rule.name)
+            if cached and now - cached[0] < RULE_CACHE_TTL_SECONDS:
+                alerts[rule.name] = cached[1]
+            else:
+                pending_rules.append(rule)
+        
+        # 条件種別ごとに独立しているため、別々の接続で並列に評価
+        rule_groups: Dict[str, List[AlertRule]] = {}
+        for rule in pending_rules:
+            rule_groups.setdefault(rule.condition_type, []).append(rule)
+        
+        if rule_groups:
+            with ThreadPoolExecutor(max_workers=min(DB_POOL_MAX_CONNECTIONS, len(rule_groups))) as executor:
+                futures = {executor.submit(self._evaluate_rules, group): group for group in rule_groups.values()}
+                for future in as_completed(futures):
+                    try:
+                        for rule, alert in zip(futures[future], future.result()):
+                            self._rule_cache[rule.name] = (now, alert)
+                            alerts[rule.name] = alert
+                    except Exception as e:
+                        logger.error(f"Alert rule evaluation error: {e}")
+        
+        triggered = []
+        for rule in active_rules:
+            alert = alerts.get(rule.name)
+            if not alert:
                 continue
             
-            alert = None
-            
-            if rule.condition_type == "sentiment_threshold":
-                alert = self.check_sentiment_threshold(rule)
-            elif rule.condition_type == "mention_count":
-                alert = self.check_mention_count(rule)
-            elif rule.condition_type == "keyword_detection":
-                alert = self.check_keyword_detection(rule)
+            # 通知済みのアラートはクールダウン期間中は再送しない
+            if now < rule.cooldown_until:
+                logger.info(f"Alert suppressed during cooldown: {alert.rule_name}")
+                continue
             
-            if alert:
-                logger.info(f"Alert triggered: {alert.rule_name}")
-                self.email_notifier.send_alert_email(rule.email_recipients, alert)
-                self._log_alert(alert)
+            logger.info(f"Alert triggered: {alert.rule_name}")
+            rule.cooldown_until = now + ALERT_COOLDOWN_SECONDS
+            triggered.append((rule, alert))
+        
+        for rule, alert in triggered:
+            self._mail_queue.put((rule.email_recipients, alert))
+        
+        self._log_alerts_bulk([alert for _, alert in triggered])
         
         logger.info("Alert checks completed")
     
-    def _log_alert(self, alert: Alert):
-        """アラートをデータベースにログ"""
+    def _log_alerts_bulk(self, alerts: List[Alert]):
+        """アラートをまとめてデータベースにログ"""
+        if not alerts:
+            return
+        
+        # 月が変わって最初の書き込みでは、当月以降のパーティションを先に用意する
+        if self._partitions_checked_month != datetime.now().date().replace(day=1):
+            self._ensure_partitions()
+        
         try:
-            with psycopg2.connect(**self.db_config) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cursor:
-                    # アラートログテーブルが存在しない場合は作成
-                    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS alert_logs (
-                            id SERIAL PRIMARY KEY,
-                            rule_name VARCHAR(255) NOT NULL,
-                            message TEXT NOT NULL,
-                            severity VARCHAR(50) NOT NULL,
-                            data JSONB,
-                            timestamp TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
-                        )
-                    """)
-                    
-                    # アラートを挿入
-                    cursor.execute("""
+                    execute_batch(cursor, """
                         INSERT INTO alert_logs (rule_name, message, severity, data)
                         VALUES (%s, %s, %s, %s)
-                    """, (alert.rule_name, alert.message, alert.severity, json.dumps(alert.data)))
-                    
-                    conn.commit()
+                    """, [(alert.rule_name, alert.message, alert.severity, Json(alert.data)) for alert in alerts], page_size=100)
                     
         except Exception as e:
-            logger.error(f"Failed to log alert: {e}")
+            logger.error(f"Failed to log alerts: {e}")
 
 def main():
     """テスト用メイン関数"""
@@ -406,7 +729,10 @@ def main():
     alert_engine = AlertEngine(db_config, smtp_config)
     
     # アラートチェックを実行
-    alert_engine.run_alert_checks()
+    try:
+        alert_engine.run_alert_checks()
+    finally:
+        alert_engine.close()
 
 if __name__ == "__main__":
     main()
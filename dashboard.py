@@ -1,11 +1,13 @@
+import os
+import time
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import altair as alt
 import psycopg2
 from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool, PoolError
 from datetime import datetime, timedelta
 import json
 from typing import Dict, List, Optional
@@ -55,76 +57,139 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# データベース設定
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'ai_monitoring',
+    'user': 'manus',
+    'password': 'manus_password'
+}
+
+# クエリ結果をキャッシュする期間（秒）。自動更新の間隔に合わせる
+CACHE_TTL_SECONDS = 30
+
+# 全セッションで共有するコネクションプールの最大接続数（同時に再実行できるクエリ数の上限）
+DB_POOL_MAX_CONNECTIONS = int(os.getenv('DASHBOARD_DB_POOL_MAX_CONNECTIONS', '10'))
+
+# プールの接続が使い切られている場合の再試行回数と間隔（秒）
+POOL_RETRY_ATTEMPTS = 3
+POOL_RETRY_INTERVAL_SECONDS = 0.2
+
+@st.cache_resource
+def get_connection_pool() -> ThreadedConnectionPool:
+    """再実行・セッションをまたいで共有するコネクションプールを取得"""
+    return ThreadedConnectionPool(1, DB_POOL_MAX_CONNECTIONS, **DB_CONFIG)
+
 class DatabaseConnection:
     """データベース接続管理"""
     
     def __init__(self):
-        self.db_config = {
-            'host': 'localhost',
-            'database': 'ai_monitoring',
-            'user': 'manus',
-            'password': 'manus_password'
-        }
+        self.db_config = DB_CONFIG
     
     def get_connection(self):
-        """データベース接続を取得"""
-        try:
-            return psycopg2.connect(**self.db_config)
-        except Exception as e:
-            st.error(f"データベース接続エラー: {e}")
-            return None
+        """プールからデータベース接続を取得（失敗時は例外を送出）"""
+        # 他のセッションの再実行で接続が使い切られている場合は、返却を少し待って再試行する
+        for attempt in range(POOL_RETRY_ATTEMPTS):
+            try:
+                return get_connection_pool().getconn()
+            except PoolError:
+                if attempt < POOL_RETRY_ATTEMPTS - 1:
+                    time.sleep(POOL_RETRY_INTERVAL_SECONDS)
+        
+        raise PoolError(
+            f"データベース接続数が上限（{DB_POOL_MAX_CONNECTIONS}）に達しています。"
+            "しばらくしてから再読み込みするか、DASHBOARD_DB_POOL_MAX_CONNECTIONS を増やしてください"
+        )
     
-    def execute_query(self, query: str, params: tuple = None) -> Optional[List[Dict]]:
-        """クエリを実行してデータを取得"""
+    def release_connection(self, conn):
+        """データベース接続をプールに返却"""
+        get_connection_pool().putconn(conn, close=bool(conn.closed))
+    
+    def execute_query(self, query: str, params: tuple = None) -> List[Dict]:
+        """クエリを実行してデータを取得（失敗時は例外を送出し、呼び出し側でフォールバックする）"""
+        conn = self.get_connection()
         try:
-            with self.get_connection() as conn:
+            with conn:
                 with conn.cursor(cursor_factory=RealDictCursor) as cursor:
                     cursor.execute(query, params)
                     return cursor.fetchall()
-        except Exception as e:
-            st.error(f"クエリ実行エラー: {e}")
-            return None
+        finally:
+            self.release_connection(conn)
 
 class DashboardData:
-    """ダッシュボード用データ取得クラス"""
+    """ダッシュボード用データ取得クラス（結果は st.cache_data でTTLの間キャッシュ）
     
-    def __init__(self):
-        self.db = DatabaseConnection()
+    キャッシュ対象の _fetch_* はDBエラー時に例外を送出するため、失敗した結果はキャッシュされない。
+    エラー表示と空データへのフォールバックはキャッシュの外側の get_* で行う。
+    """
     
-    def get_summary_stats(self) -> Dict:
+    @staticmethod
+    def get_summary_stats() -> Dict:
         """サマリー統計を取得"""
-        # 総応答数
-        total_responses = self.db.execute_query(
-            "SELECT COUNT(*) as count FROM ai_responses"
-        )
-        
-        # 今日の応答数
-        today_responses = self.db.execute_query(
-            "SELECT COUNT(*) as count FROM ai_responses WHERE DATE(timestamp) = CURRENT_DATE"
-        )
-        
-        # ブランド言及数
-        total_mentions = self.db.execute_query(
-            "SELECT COUNT(*) as count FROM brand_mentions"
-        )
+        try:
+            return DashboardData._fetch_summary_stats()
+        except Exception as e:
+            st.error(f"クエリ実行エラー: {e}")
+            return {
+                'total_responses': 0,
+                'today_responses': 0,
+                'total_mentions': 0,
+                'sentiment_stats': []
+            }
+    
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+    def _fetch_summary_stats() -> Dict:
+        """サマリー統計をデータベースから取得"""
+        db = DatabaseConnection()
         
-        # 感情分析結果
-        sentiment_stats = self.db.execute_query("""
-            SELECT response_sentiment, COUNT(*) as count 
-            FROM ai_responses 
-            WHERE response_sentiment IS NOT NULL 
-            GROUP BY response_sentiment
+        # 総応答数・今日の応答数・ブランド言及数・感情分析結果を1回のクエリで取得
+        stats = db.execute_query("""
+            SELECT 
+                (SELECT COUNT(*) FROM ai_responses) as total_responses,
+                (SELECT COUNT(*) FROM ai_responses WHERE DATE(timestamp) = CURRENT_DATE) as today_responses,
+                (SELECT COUNT(*) FROM brand_mentions) as total_mentions,
+                (
+                    SELECT json_agg(s)
+                    FROM (
+                        SELECT response_sentiment, COUNT(*) as count 
+                        FROM ai_responses 
+                        WHERE response_sentiment IS NOT NULL 
+                        GROUP BY response_sentiment
+                    ) s
+                ) as sentiment_stats
         """)
         
+        if not stats:
+            return {
+                'total_responses': 0,
+                'today_responses': 0,
+                'total_mentions': 0,
+                'sentiment_stats': []
+            }
+        
         return {
-            'total_responses': total_responses[0]['count'] if total_responses else 0,
-            'today_responses': today_responses[0]['count'] if today_responses else 0,
-            'total_mentions': total_mentions[0]['count'] if total_mentions else 0,
-            'sentiment_stats': sentiment_stats or []
+            'total_responses': stats[0]['total_responses'],
+            'today_responses': stats[0]['today_responses'],
+            'total_mentions': stats[0]['total_mentions'],
+            'sentiment_stats': stats[0]['sentiment_stats'] or []
         }
     
-    def get_ai_response_trends(self, days: int = 7) -> pd.DataFrame:
+    @staticmethod
+    def get_ai_response_trends(days: int = 7) -> pd.DataFrame:
         """AI応答のトレンドデータを取得"""
+        try:
+            return DashboardData._fetch_ai_response_trends(days)
+        except Exception as e:
+            st.error(f"クエリ実行エラー: {e}")
+            return pd.DataFrame()
+    
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+    def _fetch_ai_response_trends(days: int) -> pd.DataFrame:
+        """AI応答のトレンドデータをデータベースから取得"""
+        db = DatabaseConnection()
+        
         query = """
             SELECT 
                 DATE(timestamp) as date,
@@ -133,16 +198,29 @@ class DashboardData:
             FROM ai_responses 
             WHERE timestamp >= CURRENT_DATE - INTERVAL '%s days'
             GROUP BY DATE(timestamp), ai_name
-            ORDER BY date DESC
+            ORDER BY ai_name, date
         """
         
-        data = self.db.execute_query(query, (days,))
+        data = db.execute_query(query, (days,))
         if data:
             return pd.DataFrame(data)
         return pd.DataFrame()
     
-    def get_brand_mention_analysis(self) -> pd.DataFrame:
+    @staticmethod
+    def get_brand_mention_analysis() -> pd.DataFrame:
         """ブランド言及分析データを取得"""
+        try:
+            return DashboardData._fetch_brand_mention_analysis()
+        except Exception as e:
+            st.error(f"クエリ実行エラー: {e}")
+            return pd.DataFrame()
+    
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+    def _fetch_brand_mention_analysis() -> pd.DataFrame:
+        """ブランド言及分析データをデータベースから取得"""
+        db = DatabaseConnection()
+        
         query = """
             SELECT 
                 bm.brand_name,
@@ -155,13 +233,27 @@ class DashboardData:
             ORDER BY mention_count DESC
         """
         
-        data = self.db.execute_query(query)
+        data = db.execute_query(query)
         if data:
             return pd.DataFrame(data)
         return pd.DataFrame()
     
-    def get_recent_responses(self, limit: int = 10) -> pd.DataFrame:
+    @staticmethod
+    def get_recent_responses(limit: int = 10) -> pd.DataFrame:
         """最近の応答データを取得"""
+        try:
+            return DashboardData._fetch_recent_responses(limit)
+        except Exception as e:
+            st.error(f"クエリ実行エラー: {e}")
+            return pd.DataFrame()
+    
+    @staticmethod
+    @st.cache_data(ttl=CACHE_TTL_SECONDS, show_spinner=False)
+    def _fetch_recent_responses(limit: int) -> pd.DataFrame:
+        """最近の応答データをデータベースから取得"""
+        db = DatabaseConnection()
+        
+        # 先に最新limit件に絞り込み、その分だけ言及数を数える
         query = """
             SELECT 
                 ar.ai_name,
@@ -169,15 +261,22 @@ class DashboardData:
                 ar.response_text,
                 ar.response_sentiment,
                 ar.timestamp,
-                COUNT(bm.id) as mention_count
-            FROM ai_responses ar
-            LEFT JOIN brand_mentions bm ON ar.id = bm.ai_response_id
-            GROUP BY ar.id, ar.ai_name, ar.query_text, ar.response_text, ar.response_sentiment, ar.timestamp
+                m.mention_count
+            FROM (
+                SELECT id, ai_name, query_text, response_text, response_sentiment, timestamp
+                FROM ai_responses
+                ORDER BY timestamp DESC
+                LIMIT %s
+            ) ar
+            LEFT JOIN LATERAL (
+                SELECT COUNT(*) as mention_count
+                FROM brand_mentions bm
+                WHERE bm.ai_response_id = ar.id
+            ) m ON true
             ORDER BY ar.timestamp DESC
-            LIMIT %s
         """
         
-        data = self.db.execute_query(query, (limit,))
+        data = db.execute_query(query, (limit,))
         if data:
             df = pd.DataFrame(data)
             # テキストを短縮
@@ -221,16 +320,20 @@ def create_trend_chart(trend_data: pd.DataFrame) -> go.Figure:
     if trend_data.empty:
         return go.Figure()
     
-    fig = px.line(
-        trend_data,
-        x='date',
-        y='response_count',
-        color='ai_name',
-        title='AI応答数の推移',
-        labels={'date': '日付', 'response_count': '応答数', 'ai_name': 'AI名'}
-    )
+    # SQL側でAI名・日付順に並べてあるため、AIごとに配列をそのまま渡す
+    fig = go.Figure([
+        go.Scatter(
+            x=group['date'].values,
+            y=group['response_count'].values,
+            mode='lines',
+            name=ai_name
+        )
+        for ai_name, group in trend_data.groupby('ai_name', sort=False)
+    ])
     
     fig.update_layout(
+        title='AI応答数の推移',
+        legend_title_text='AI名',
         font=dict(family="Arial, sans-serif", size=12),
         xaxis_title="日付",
         yaxis_title="応答数"
@@ -243,21 +346,36 @@ def create_brand_mention_chart(mention_data: pd.DataFrame) -> go.Figure:
     if mention_data.empty:
         return go.Figure()
     
-    fig = px.bar(
-        mention_data,
-        x='brand_name',
-        y='mention_count',
-        color='sentiment',
-        title='ブランド言及数（感情別）',
-        labels={'brand_name': 'ブランド名', 'mention_count': '言及数', 'sentiment': '感情'},
-        color_discrete_map={
-            'positive': '#28a745',
-            'negative': '#dc3545',
-            'neutral': '#ffc107'
-        }
-    )
+    colors = {
+        'positive': '#28a745',
+        'negative': '#dc3545',
+        'neutral': '#ffc107'
+    }
+    
+    # ブランド×感情で集計し、感情ごとの積み上げ棒にする（並びは言及数の多い順を維持）
+    pivot = mention_data.pivot_table(
+        index='brand_name',
+        columns='sentiment',
+        values='mention_count',
+        aggfunc='sum',
+        fill_value=0
+    ).reindex(index=mention_data['brand_name'].unique(), columns=mention_data['sentiment'].dropna().unique(), fill_value=0)
+    
+    brand_names = pivot.index.values
+    fig = go.Figure([
+        go.Bar(
+            x=brand_names,
+            y=pivot[sentiment].values,
+            name=sentiment,
+            marker_color=colors.get(sentiment)
+        )
+        for sentiment in pivot.columns
+    ])
     
     fig.update_layout(
+        title='ブランド言及数（感情別）',
+        barmode='stack',
+        legend_title_text='感情',
         font=dict(family="Arial, sans-serif", size=12),
         xaxis_title="ブランド名",
         yaxis_title="言及数"
@@ -295,6 +413,9 @@ def main():
     
     summary_stats = dashboard_data.get_summary_stats()
     
+    # 感情ごとの応答数
+    sentiment_counts = {s['response_sentiment']: s['count'] for s in summary_stats['sentiment_stats']}
+    
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
@@ -311,14 +432,14 @@ def main():
         )
     
     with col3:
-        positive_count = sum(1 for s in summary_stats['sentiment_stats'] if s['response_sentiment'] == 'positive')
+        positive_count = sentiment_counts.get('positive', 0)
         st.metric(
             label="ポジティブ応答",
             value=positive_count
         )
     
     with col4:
-        negative_count = sum(1 for s in summary_stats['sentiment_stats'] if s['response_sentiment'] == 'negative')
+        negative_count = sentiment_counts.get('negative', 0)
         st.metric(
             label="ネガティブ応答",
             value=negative_count
@@ -358,19 +479,23 @@ def main():
     
     recent_data = dashboard_data.get_recent_responses(20)
     if not recent_data.empty:
-        # 応答の表示
-        for _, row in recent_data.iterrows():
-            sentiment_class = f"alert-{row['response_sentiment']}" if row['response_sentiment'] else "alert-neutral"
-            
-            st.markdown(f"""
-            <div class="alert-box {sentiment_class}">
-                <strong>{row['ai_name']}</strong> - {row['timestamp']}<br>
-                <strong>質問:</strong> {row['query_text']}<br>
-                <strong>応答:</strong> {row['response_preview']}<br>
-                <strong>感情:</strong> {row['response_sentiment'] or 'N/A'} | 
-                <strong>言及数:</strong> {row['mention_count']}
-            </div>
-            """, unsafe_allow_html=True)
+        # 表示用の列をまとめて作成し、全ての応答を1回の描画で表示
+        display_data = recent_data.assign(
+            sentiment_class='alert-' + recent_data['response_sentiment'].fillna('neutral'),
+            sentiment_label=recent_data['response_sentiment'].fillna('N/A')
+        )
+        
+        responses_html = "".join(
+            f'<div class="alert-box {row.sentiment_class}">'
+            f'<strong>{row.ai_name}</strong> - {row.timestamp}<br>'
+            f'<strong>質問:</strong> {row.query_text}<br>'
+            f'<strong>応答:</strong> {row.response_preview}<br>'
+            f'<strong>感情:</strong> {row.sentiment_label} | '
+            f'<strong>言及数:</strong> {row.mention_count}'
+            '</div>'
+            for row in display_data.itertuples(index=False)
+        )
+        st.markdown(responses_html, unsafe_allow_html=True)
     else:
         st.info("応答データがありません。")
     
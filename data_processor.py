@@ -1,7 +1,13 @@
+import os
 import re
 import json
 import logging
-from typing import List, Dict, Optional, Tuple
+import functools
+import hashlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple, Union
+import ahocorasick
 import nltk
 import spacy
 from transformers import pipeline, AutoTokenizer, AutoModel
@@ -9,33 +15,74 @@ from sentence_transformers import SentenceTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
 import numpy as np
+import torch
 import chromadb
 from chromadb.config import Settings
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
+
+# ONNX Runtime（optimum）が利用可能な場合はモデルをONNX化して推論する
+try:
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+except ImportError:
+    ORTModelForSequenceClassification = None
 
 # ログ設定
 logger = logging.getLogger(__name__)
 
+# 感情分析・文埋め込みモデル
+SENTIMENT_MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+SENTENCE_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# ONNX変換・量子化済みモデルの保存先（初回起動時に作成し、以降は再利用）
+ONNX_MODEL_DIR = "./onnx_models"
+
+# 同一テキストの埋め込みを再計算しないためのキャッシュ件数（テキストのハッシュ値で管理）
+EMBEDDING_CACHE_SIZE = 4096
+
+# コネクションプールの最大接続数
+DB_POOL_MAX_CONNECTIONS = 8
+
+# 未処理応答の読み出し件数（サーバーサイドカーソルの1往復あたり）と、まとめて解析・保存する件数
+UNPROCESSED_FETCH_ITERSIZE = 200
+PROCESS_BATCH_SIZE = 64
+
+# 前処理・リンク抽出で使う正規表現（モジュール読み込み時に1回だけコンパイル）
+# URLは従来の選択肢パターンと同じ文字集合を1つの文字クラスにまとめ、バックトラックを避ける
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_URL_RE = re.compile(r'https?://[a-zA-Z0-9$-_@.&+!*\\(),]+')
+
+# 必要なNLTKデータ（パッケージ名, 検索パス）
+_NLTK_DATA = [
+    ('punkt', 'tokenizers/punkt'),
+    ('stopwords', 'corpora/stopwords'),
+    ('vader_lexicon', 'vader_lexicon')
+]
+_nltk_data_ready = False
+
+def _ensure_nltk_data():
+    """NLTKデータの有無を確認し、不足分をダウンロード（2回目以降は何もしない）"""
+    global _nltk_data_ready
+    if _nltk_data_ready:
+        return
+    
+    for package, path in _NLTK_DATA:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(package)
+    
+    _nltk_data_ready = True
+
 class TextAnalyzer:
     """テキスト解析を行うクラス"""
     
     def __init__(self):
-        # NLTKデータのダウンロード
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-        
-        try:
-            nltk.data.find('vader_lexicon')
-        except LookupError:
-            nltk.download('vader_lexicon')
+        # NLTKデータのダウンロード（確認はプロセス内で1回だけ）
+        _ensure_nltk_data()
         
         # spaCyモデルの初期化（日本語対応）
         try:
@@ -48,44 +95,137 @@ class TextAnalyzer:
                 logger.warning("English spaCy model not found, using basic tokenizer")
                 self.nlp = None
         
-        # 感情分析パイプライン
-        try:
-            self.sentiment_analyzer = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                return_all_scores=True
+        # 使うのは固有表現のみのため、NERとその入力（tok2vec）以外のコンポーネントを無効化
+        if self.nlp:
+            self.nlp.select_pipes(disable=[name for name in self.nlp.pipe_names if name not in ("tok2vec", "ner")])
+        
+        # 推論デバイス（CUDA / Apple MPS / CPU）
+        self.device = self._detect_device()
+        logger.info(f"Using device for text models: {self.device}")
+        
+        # ONNX Runtime（CPU向け）はGPUが使えない場合のみ利用する
+        use_onnx = ORTModelForSequenceClassification is not None and self.device == "cpu"
+        
+        # 感情分析パイプライン（CPUでONNX Runtimeが使えればint8量子化モデル、それ以外はPyTorch）
+        self.sentiment_analyzer = None
+        if use_onnx:
+            try:
+                self.sentiment_analyzer = self._load_onnx_sentiment_analyzer()
+            except Exception as e:
+                logger.warning(f"Could not load ONNX sentiment analyzer, falling back to PyTorch: {e}")
+        
+        if self.sentiment_analyzer is None:
+            try:
+                self.sentiment_analyzer = pipeline(
+                    "sentiment-analysis",
+                    model=SENTIMENT_MODEL_NAME,
+                    device=self.device
+                )
+            except Exception as e:
+                logger.warning(f"Could not load sentiment analyzer: {e}")
+        
+        # 文埋め込みモデル（CPUでONNX Runtimeが使えればint8量子化したONNXバックエンド）
+        self.sentence_model = None
+        if use_onnx:
+            try:
+                self.sentence_model = self._load_onnx_sentence_model()
+            except Exception as e:
+                logger.warning(f"Could not load ONNX sentence transformer, falling back to PyTorch: {e}")
+        
+        if self.sentence_model is None:
+            try:
+                self.sentence_model = SentenceTransformer(SENTENCE_MODEL_NAME, device=self.device)
+            except Exception as e:
+                logger.warning(f"Could not load sentence transformer: {e}")
+        
+        # 埋め込みキャッシュ（blake2bダイジェスト → 正規化済みベクトル、LRU）
+        self._embedding_cache: OrderedDict = OrderedDict()
+    
+    @staticmethod
+    def _detect_device() -> str:
+        """利用可能な推論デバイスを検出"""
+        if torch.cuda.is_available():
+            return "cuda"
+        if torch.backends.mps.is_available():
+            return "mps"
+        return "cpu"
+    
+    @contextmanager
+    def _inference_context(self):
+        """推論用コンテキスト（勾配計算なし、CUDAではFP16の自動混合精度）"""
+        with torch.inference_mode():
+            if self.device == "cuda":
+                with torch.autocast(device_type="cuda", dtype=torch.float16):
+                    yield
+            else:
+                yield
+    
+    def _load_onnx_sentiment_analyzer(self):
+        """感情分析モデルをONNX形式で読み込み（初回はエクスポートとint8動的量子化を行い保存）"""
+        model_dir = os.path.join(ONNX_MODEL_DIR, "sentiment")
+        
+        if not os.path.isdir(model_dir):
+            model = ORTModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL_NAME, export=True)
+            quantizer = ORTQuantizer.from_pretrained(model)
+            quantizer.quantize(
+                save_dir=model_dir,
+                quantization_config=AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
             )
-        except Exception as e:
-            logger.warning(f"Could not load sentiment analyzer: {e}")
-            self.sentiment_analyzer = None
+            AutoTokenizer.from_pretrained(SENTIMENT_MODEL_NAME).save_pretrained(model_dir)
         
-        # 文埋め込みモデル
-        try:
-            self.sentence_model = SentenceTransformer('all-MiniLM-L6-v2')
-        except Exception as e:
-            logger.warning(f"Could not load sentence transformer: {e}")
-            self.sentence_model = None
+        model = ORTModelForSequenceClassification.from_pretrained(
+            model_dir,
+            file_name="model_quantized.onnx",
+            provider="CPUExecutionProvider"
+        )
+        tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+    
+    def _load_onnx_sentence_model(self) -> SentenceTransformer:
+        """文埋め込みモデルをONNX形式で読み込み（初回はエクスポートとint8動的量子化を行い保存）"""
+        model_dir = os.path.join(ONNX_MODEL_DIR, "sentence")
+        
+        if not os.path.isdir(model_dir):
+            model = SentenceTransformer(SENTENCE_MODEL_NAME, backend="onnx")
+            model.save(model_dir)
+            export_dynamic_quantized_onnx_model(model, "avx512_vnni", model_dir)
+        
+        return SentenceTransformer(
+            model_dir,
+            backend="onnx",
+            model_kwargs={"file_name": "onnx/model_qint8_avx512_vnni.onnx", "provider": "CPUExecutionProvider"}
+        )
     
     def preprocess_text(self, text: str) -> str:
         """テキストの前処理"""
-        # HTMLタグの除去
-        text = re.sub(r'<[^>]+>', '', text)
+        # HTMLタグの除去（タグがない場合は正規表現の走査を省略）
+        if '<' in text:
+            text = _HTML_TAG_RE.sub('', text)
         
         # URLの除去
-        text = re.sub(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', '', text)
+        if '://' in text:
+            text = _URL_RE.sub('', text)
         
-        # 特殊文字の正規化
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        
-        return text
+        # 特殊文字の正規化（連続する空白を1つにし、前後の空白を除去）
+        return ' '.join(text.split())
     
     def extract_entities(self, text: str) -> List[Dict[str, str]]:
         """固有表現抽出"""
         if not self.nlp:
             return []
         
-        doc = self.nlp(text)
+        return self._entities_from_doc(self.nlp(text))
+    
+    def extract_entities_batch(self, texts: List[str]) -> List[List[Dict[str, str]]]:
+        """複数テキストの固有表現をまとめて抽出"""
+        if not self.nlp:
+            return [[] for _ in texts]
+        
+        return [self._entities_from_doc(doc) for doc in self.nlp.pipe(texts, batch_size=128)]
+    
+    @staticmethod
+    def _entities_from_doc(doc) -> List[Dict[str, str]]:
+        """spaCyのDocから固有表現のリストを作成"""
         entities = []
         
         for ent in doc.ents:
@@ -98,30 +238,43 @@ class TextAnalyzer:
         
         return entities
     
-    def analyze_sentiment(self, text: str) -> Dict[str, float]:
-        """感情分析"""
-        if not self.sentiment_analyzer:
-            return {'positive': 0.33, 'negative': 0.33, 'neutral': 0.34}
+    def analyze_sentiment(self, text: Union[str, List[str]]) -> Union[Dict[str, float], List[Dict[str, float]]]:
+        """感情分析（リストを渡した場合はまとめて推論し、入力順に結果を返す）"""
+        texts = [text] if isinstance(text, str) else text
+        default_scores = [{'positive': 0.33, 'negative': 0.33, 'neutral': 0.34} for _ in texts]
+        
+        if not self.sentiment_analyzer or not texts:
+            return default_scores[0] if isinstance(text, str) else default_scores
         
         try:
-            results = self.sentiment_analyzer(text[:512])  # トークン制限
-            sentiment_scores = {}
+            with self._inference_context():
+                results = self.sentiment_analyzer(
+                    [t[:512] for t in texts],  # トークン制限
+                    batch_size=16,
+                    truncation=True,
+                    max_length=512,
+                    top_k=None
+                )
+            all_scores = []
             
-            for result in results[0]:
-                label = result['label'].lower()
-                score = result['score']
-                
-                if 'pos' in label:
-                    sentiment_scores['positive'] = score
-                elif 'neg' in label:
-                    sentiment_scores['negative'] = score
-                else:
-                    sentiment_scores['neutral'] = score
+            for text_results in results:
+                sentiment_scores = {}
+                for result in text_results:
+                    label = result['label'].lower()
+                    score = result['score']
+                    
+                    if 'pos' in label:
+                        sentiment_scores['positive'] = score
+                    elif 'neg' in label:
+                        sentiment_scores['negative'] = score
+                    else:
+                        sentiment_scores['neutral'] = score
+                all_scores.append(sentiment_scores)
             
-            return sentiment_scores
+            return all_scores[0] if isinstance(text, str) else all_scores
         except Exception as e:
             logger.error(f"Sentiment analysis error: {e}")
-            return {'positive': 0.33, 'negative': 0.33, 'neutral': 0.34}
+            return default_scores[0] if isinstance(text, str) else default_scores
     
     def extract_topics(self, texts: List[str], n_topics: int = 5) -> List[List[str]]:
         """トピック抽出（TF-IDFベース）"""
@@ -143,54 +296,125 @@ class TextAnalyzer:
             kmeans = KMeans(n_clusters=min(n_topics, len(texts)), random_state=42)
             clusters = kmeans.fit_predict(tfidf_matrix)
             
-            # 各クラスタの代表的な単語を抽出
-            topics = []
-            for i in range(n_topics):
-                cluster_center = kmeans.cluster_centers_[i]
-                top_indices = cluster_center.argsort()[-10:][::-1]
-                topic_words = [feature_names[idx] for idx in top_indices]
-                topics.append(topic_words)
+            # 各クラスタの代表的な単語を抽出（全クラスタ分の上位語をまとめて選択）
+            centers = kmeans.cluster_centers_.astype(np.float32, copy=False)
+            top_n = min(10, centers.shape[1])
+            top_indices = np.argpartition(centers, -top_n, axis=1)[:, -top_n:]
             
-            return topics
+            # 選んだ上位語をスコアの降順に並べ替え
+            order = np.argsort(-np.take_along_axis(centers, top_indices, axis=1), axis=1)
+            top_indices = np.take_along_axis(top_indices, order, axis=1)
+            
+            return feature_names[top_indices].tolist()
         except Exception as e:
             logger.error(f"Topic extraction error: {e}")
             return []
     
     def get_text_embedding(self, text: str) -> Optional[np.ndarray]:
         """テキストの埋め込みベクトルを取得"""
+        embeddings = self.get_text_embeddings_batch([text])
+        if embeddings is None:
+            return None
+        return embeddings[0]
+    
+    def get_text_embeddings_batch(self, texts: List[str]) -> Optional[np.ndarray]:
+        """複数テキストの埋め込みベクトルを (N, D) の連続したfloat32配列で取得（キャッシュ済みのテキストは再計算しない）"""
         if not self.sentence_model:
             return None
         
         try:
-            embedding = self.sentence_model.encode(text)
-            return embedding
+            keys = [hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest() for text in texts]
+            
+            # キャッシュにあるものを取り出し、ないものだけを重複なく集める
+            embeddings = {}
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key in embeddings or key in missing:
+                    continue
+                if key in self._embedding_cache:
+                    self._embedding_cache.move_to_end(key)
+                    embeddings[key] = self._embedding_cache[key]
+                else:
+                    missing[key] = text
+            
+            if missing:
+                # encodeは内部で長さ順に並べ替えてからミニバッチ化し、結果は入力順で返す
+                with self._inference_context():
+                    encoded = self.sentence_model.encode(
+                        list(missing.values()),
+                        batch_size=32,
+                        show_progress_bar=False,
+                        convert_to_numpy=True,
+                        normalize_embeddings=True
+                    )
+                encoded = np.ascontiguousarray(encoded, dtype=np.float32)
+                
+                # キャッシュには行ごとのコピーを保持し、バッチ全体の配列を参照し続けないようにする
+                for key, embedding in zip(missing, encoded):
+                    embeddings[key] = embedding
+                    self._embedding_cache[key] = embedding.copy()
+                
+                while len(self._embedding_cache) > EMBEDDING_CACHE_SIZE:
+                    self._embedding_cache.popitem(last=False)
+                
+                # 全件が新規かつ重複なしなら、encodeの結果をそのまま返す
+                if len(missing) == len(keys):
+                    return encoded
+            
+            # キャッシュ分と新規分を1つの (N, D) 配列に詰める
+            result = np.empty((len(keys), self.sentence_model.get_sentence_embedding_dimension()), dtype=np.float32)
+            for index, key in enumerate(keys):
+                result[index] = embeddings[key]
+            return result
         except Exception as e:
             logger.error(f"Text embedding error: {e}")
             return None
 
+@functools.lru_cache(maxsize=None)
+def get_text_analyzer() -> TextAnalyzer:
+    """プロセス内で共有するTextAnalyzerを取得（モデルの読み込みは初回のみ）"""
+    return TextAnalyzer()
+
 class BrandMentionDetector:
     """ブランド言及検出クラス"""
     
-    def __init__(self, brand_keywords: List[str]):
+    def __init__(self, brand_keywords: List[str], text_analyzer: Optional[TextAnalyzer] = None):
         self.brand_keywords = [keyword.lower() for keyword in brand_keywords]
-        self.text_analyzer = TextAnalyzer()
+        self.text_analyzer = text_analyzer or get_text_analyzer()
+        
+        # 全キーワードを1回の走査で検出するAho-Corasickオートマトン
+        self.automaton = ahocorasick.Automaton()
+        for keyword in self.brand_keywords:
+            if keyword:
+                self.automaton.add_word(keyword, keyword)
+        self.automaton.make_automaton()
     
-    def detect_mentions(self, text: str) -> List[Dict[str, any]]:
-        """テキスト内のブランド言及を検出"""
+    def detect_mentions(self, text: str, precomputed_sentiment: Optional[Dict[str, float]] = None) -> List[Dict[str, any]]:
+        """テキスト内のブランド言及を検出（感情スコアが計算済みなら再利用）"""
         mentions = []
+        if len(self.automaton) == 0:
+            return mentions
+        
         text_lower = text.lower()
+        sentiment_scores = precomputed_sentiment
+        
+        # 1回の走査で各キーワードの最初の出現位置を取得（一致は終端位置の昇順で返る）
+        first_positions = {}
+        for end_index, keyword in self.automaton.iter(text_lower):
+            first_positions.setdefault(keyword, end_index - len(keyword) + 1)
         
         for keyword in self.brand_keywords:
-            if keyword in text_lower:
+            if keyword in first_positions:
                 # 言及の種類を判定
-                mention_type = self._classify_mention_type(text, keyword)
+                mention_type = self._classify_mention_type(text_lower, keyword)
                 
-                # 感情分析
-                sentiment_scores = self.text_analyzer.analyze_sentiment(text)
+                # 感情分析（テキスト全体に対して1回だけ実行）
+                if sentiment_scores is None:
+                    sentiment_scores = self.text_analyzer.analyze_sentiment(text)
                 sentiment = max(sentiment_scores, key=sentiment_scores.get)
                 
-                # コンテキスト抽出
-                context = self._extract_context(text, keyword)
+                # コンテキスト抽出（検出済みの位置を利用）
+                context = self._extract_context(text, text_lower, keyword, keyword_pos=first_positions[keyword])
                 
                 mentions.append({
                     'brand_name': keyword,
@@ -202,10 +426,8 @@ class BrandMentionDetector:
         
         return mentions
     
-    def _classify_mention_type(self, text: str, keyword: str) -> str:
-        """言及の種類を分類"""
-        text_lower = text.lower()
-        
+    def _classify_mention_type(self, text_lower: str, keyword: str) -> str:
+        """言及の種類を分類（小文字化済みのテキストを受け取る）"""
         # URLが含まれている場合
         if 'http' in text_lower and keyword in text_lower:
             return 'link'
@@ -216,10 +438,11 @@ class BrandMentionDetector:
         
         return 'implied'
     
-    def _extract_context(self, text: str, keyword: str, window_size: int = 100) -> str:
-        """キーワード周辺のコンテキストを抽出"""
-        text_lower = text.lower()
-        keyword_pos = text_lower.find(keyword)
+    def _extract_context(self, text: str, text_lower: str, keyword: str, window_size: int = 100,
+                         keyword_pos: Optional[int] = None) -> str:
+        """キーワード周辺のコンテキストを抽出（検索には小文字化済みのテキストを使う）"""
+        if keyword_pos is None:
+            keyword_pos = text_lower.find(keyword)
         
         if keyword_pos == -1:
             return text[:200]  # キーワードが見つからない場合は先頭200文字
@@ -232,21 +455,31 @@ class BrandMentionDetector:
 class VectorDatabase:
     """ベクトルデータベース管理クラス"""
     
-    def __init__(self, db_path: str = "./chroma_db"):
-        self.client = chromadb.PersistentClient(path=db_path)
+    def __init__(self, db_path: str = "./chroma_db", text_analyzer: Optional[TextAnalyzer] = None):
+        self.client = chromadb.PersistentClient(
+            path=db_path,
+            settings=Settings(anonymized_telemetry=False)
+        )
+        # HNSWのパラメータはコレクション作成時のみ有効（既存コレクションの設定はそのまま）
         self.collection = self.client.get_or_create_collection(
             name="ai_responses",
-            metadata={"hnsw:space": "cosine"}
+            metadata={
+                "hnsw:space": "cosine",
+                "hnsw:M": 32,
+                "hnsw:construction_ef": 200,
+                "hnsw:search_ef": 64
+            }
         )
-        self.text_analyzer = TextAnalyzer()
+        self.text_analyzer = text_analyzer or get_text_analyzer()
     
     def add_response(self, response_id: str, text: str, metadata: Dict[str, any]):
         """AI応答をベクトルデータベースに追加"""
         try:
             embedding = self.text_analyzer.get_text_embedding(text)
             if embedding is not None:
+                # ndarrayのまま渡し、Pythonのfloatリストへの変換を省く
                 self.collection.add(
-                    embeddings=[embedding.tolist()],
+                    embeddings=embedding.reshape(1, -1),
                     documents=[text],
                     metadatas=[metadata],
                     ids=[response_id]
@@ -255,16 +488,36 @@ class VectorDatabase:
         except Exception as e:
             logger.error(f"Error adding to vector database: {e}")
     
-    def search_similar(self, query_text: str, n_results: int = 5) -> List[Dict[str, any]]:
-        """類似した応答を検索"""
+    def add_responses_bulk(self, response_ids: List[str], texts: List[str], metadatas: List[Dict[str, any]]):
+        """複数のAI応答をまとめてベクトルデータベースに追加"""
+        if not response_ids:
+            return
+        
+        try:
+            embeddings = self.text_analyzer.get_text_embeddings_batch(texts)
+            if embeddings is not None:
+                self.collection.add(
+                    embeddings=embeddings,
+                    documents=texts,
+                    metadatas=metadatas,
+                    ids=response_ids
+                )
+                logger.info(f"Added {len(response_ids)} responses to vector database")
+        except Exception as e:
+            logger.error(f"Error adding to vector database: {e}")
+    
+    def search_similar(self, query_text: str, n_results: int = 5,
+                       include: Optional[List[str]] = None) -> List[Dict[str, any]]:
+        """類似した応答を検索（既定では本文を返さず、メタデータと距離のみ取得）"""
         try:
             query_embedding = self.text_analyzer.get_text_embedding(query_text)
             if query_embedding is None:
                 return []
             
             results = self.collection.query(
-                query_embeddings=[query_embedding.tolist()],
-                n_results=n_results
+                query_embeddings=query_embedding.reshape(1, -1),
+                n_results=n_results,
+                include=include or ["metadatas", "distances"]
             )
             
             return results
@@ -277,106 +530,188 @@ class DataProcessor:
     
     def __init__(self, db_config: Dict[str, str], brand_keywords: List[str]):
         self.db_config = db_config
-        self.text_analyzer = TextAnalyzer()
-        self.brand_detector = BrandMentionDetector(brand_keywords)
-        self.vector_db = VectorDatabase()
+        # 分析結果は未処理行（response_sentiment IS NULL）として再計算できるため、
+        # クラッシュ時に直近のコミットが失われても許容し、同期コミットを無効にする
+        # db_configに既にoptionsがある場合はそれに追記する
+        self.pool = ThreadedConnectionPool(
+            1, DB_POOL_MAX_CONNECTIONS,
+            **{**db_config, 'options': (db_config.get('options', '') + ' -c synchronous_commit=off').strip()}
+        )
+        # モデルを1回だけ読み込み、各コンポーネントで共有する
+        self.text_analyzer = get_text_analyzer()
+        self.brand_detector = BrandMentionDetector(brand_keywords, text_analyzer=self.text_analyzer)
+        self.vector_db = VectorDatabase(text_analyzer=self.text_analyzer)
     
     def process_ai_response(self, response_id: int, ai_name: str, query_text: str, response_text: str):
         """AI応答を処理して分析結果をデータベースに保存"""
         try:
-            # テキスト前処理
-            processed_text = self.text_analyzer.preprocess_text(response_text)
-            
-            # 感情分析
-            sentiment_scores = self.text_analyzer.analyze_sentiment(processed_text)
-            sentiment = max(sentiment_scores, key=sentiment_scores.get)
-            
-            # 固有表現抽出
-            entities = self.text_analyzer.extract_entities(processed_text)
-            
-            # ブランド言及検出
-            brand_mentions = self.brand_detector.detect_mentions(processed_text)
-            
-            # URLリンク抽出
-            links = re.findall(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', response_text)
+            result = self._analyze_response(response_id, ai_name, query_text, response_text)
             
             # データベースを更新
-            self._update_database(response_id, sentiment, entities, links, brand_mentions)
+            self._update_database([result])
             
             # ベクトルデータベースに追加
-            metadata = {
-                'ai_name': ai_name,
-                'query_text': query_text,
-                'sentiment': sentiment,
-                'timestamp': str(response_id)
-            }
-            self.vector_db.add_response(str(response_id), processed_text, metadata)
+            self.vector_db.add_response(str(response_id), result['processed_text'], result['metadata'])
             
             logger.info(f"Processed response {response_id} from {ai_name}")
             
         except Exception as e:
             logger.error(f"Error processing response {response_id}: {e}")
     
-    def _update_database(self, response_id: int, sentiment: str, entities: List[Dict], 
-                        links: List[str], brand_mentions: List[Dict]):
-        """データベースを更新"""
+    def _analyze_response(self, response_id: int, ai_name: str, query_text: str, response_text: str,
+                          sentiment_scores: Optional[Dict[str, float]] = None,
+                          entities: Optional[List[Dict[str, str]]] = None) -> Dict[str, any]:
+        """AI応答を解析し、保存用の結果をまとめる（感情スコア・固有表現が計算済みなら再利用）"""
+        # テキスト前処理
+        processed_text = self.text_analyzer.preprocess_text(response_text)
+        
+        # 感情分析
+        if sentiment_scores is None:
+            sentiment_scores = self.text_analyzer.analyze_sentiment(processed_text)
+        sentiment = max(sentiment_scores, key=sentiment_scores.get)
+        
+        # 固有表現抽出
+        if entities is None:
+            entities = self.text_analyzer.extract_entities(processed_text)
+        
+        # ブランド言及検出
+        brand_mentions = self.brand_detector.detect_mentions(processed_text, precomputed_sentiment=sentiment_scores)
+        
+        # URLリンク抽出
+        links = _URL_RE.findall(response_text)
+        
+        return {
+            'response_id': response_id,
+            'processed_text': processed_text,
+            'sentiment': sentiment,
+            'entities': entities,
+            'links': links,
+            'brand_mentions': brand_mentions,
+            'metadata': {
+                'ai_name': ai_name,
+                'query_text': query_text,
+                'sentiment': sentiment,
+                'timestamp': str(response_id)
+            }
+        }
+    
+    @contextmanager
+    def _conn(self):
+        """プールから接続を借りてトランザクション終了後に返却"""
+        conn = self.pool.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            # サーバー側で切断された接続はプールに戻さず破棄
+            self.pool.putconn(conn, close=bool(conn.closed))
+    
+    def close(self):
+        """プール内の全接続を閉じる"""
+        self.pool.closeall()
+    
+    def _update_database(self, results: List[Dict[str, any]]):
+        """解析結果をまとめてデータベースに反映"""
+        if not results:
+            return
+        
         try:
-            with psycopg2.connect(**self.db_config) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cursor:
-                    # ai_responsesテーブルを更新
-                    cursor.execute("""
-                        UPDATE ai_responses 
-                        SET response_sentiment = %s, response_links = %s
-                        WHERE id = %s
-                    """, (sentiment, links, response_id))
+                    # ai_responsesテーブルを1文で更新
+                    execute_values(cursor, """
+                        UPDATE ai_responses
+                        SET response_sentiment = data.sentiment, response_links = data.links
+                        FROM (VALUES %s) AS data(sentiment, links, id)
+                        WHERE ai_responses.id = data.id
+                    """, [
+                        (result['sentiment'], result['links'], result['response_id'])
+                        for result in results
+                    ], template="(%s, %s::text[], %s::integer)")
                     
-                    # brand_mentionsテーブルに挿入
-                    for mention in brand_mentions:
-                        cursor.execute("""
-                            INSERT INTO brand_mentions 
-                            (ai_response_id, brand_name, mention_type, sentiment, context)
-                            VALUES (%s, %s, %s, %s, %s)
-                        """, (
-                            response_id,
+                    # brand_mentionsテーブルに一括挿入
+                    mention_rows = [
+                        (
+                            result['response_id'],
                             mention['brand_name'],
                             mention['mention_type'],
                             mention['sentiment'],
                             mention['context']
-                        ))
-                    
-                    conn.commit()
+                        )
+                        for result in results
+                        for mention in result['brand_mentions']
+                    ]
+                    if mention_rows:
+                        execute_values(cursor, """
+                            INSERT INTO brand_mentions 
+                            (ai_response_id, brand_name, mention_type, sentiment, context)
+                            VALUES %s
+                        """, mention_rows, page_size=500)
                     
         except Exception as e:
             logger.error(f"Database update error: {e}")
     
     def batch_process_unprocessed_responses(self):
-        """未処理の応答をバッチ処理"""
+        """未処理の応答をバッチ処理（サーバーサイドカーソルで読み出し、一定件数ごとに解析・保存）"""
         try:
-            with psycopg2.connect(**self.db_config) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # 未処理の応答を取得
+            processed_count = 0
+            
+            # 読み出し用の接続はカーソルを開いている間保持し、書き込みは別の接続で行う
+            with self._conn() as conn:
+                with conn.cursor(name="unprocessed_responses", cursor_factory=RealDictCursor) as cursor:
+                    cursor.itersize = UNPROCESSED_FETCH_ITERSIZE
                     cursor.execute("""
                         SELECT id, ai_name, query_text, response_text
                         FROM ai_responses
                         WHERE response_sentiment IS NULL
                         ORDER BY timestamp DESC
-                        LIMIT 100
                     """)
                     
-                    responses = cursor.fetchall()
+                    batch = []
+                    for response in cursor:
+                        batch.append(response)
+                        if len(batch) >= PROCESS_BATCH_SIZE:
+                            processed_count += self._process_batch(batch)
+                            batch = []
                     
-                    for response in responses:
-                        self.process_ai_response(
-                            response['id'],
-                            response['ai_name'],
-                            response['query_text'],
-                            response['response_text']
-                        )
-                        
-            logger.info(f"Batch processed {len(responses)} responses")
+                    if batch:
+                        processed_count += self._process_batch(batch)
+            
+            logger.info(f"Batch processed {processed_count} responses")
             
         except Exception as e:
             logger.error(f"Batch processing error: {e}")
+    
+    def _process_batch(self, responses: List[Dict[str, any]]) -> int:
+        """応答のまとまりを解析し、結果と埋め込みを保存"""
+        # 感情分析・固有表現抽出はまとめて実行する
+        processed_texts = [self.text_analyzer.preprocess_text(r['response_text']) for r in responses]
+        all_sentiment_scores = self.text_analyzer.analyze_sentiment(processed_texts)
+        all_entities = self.text_analyzer.extract_entities_batch(processed_texts)
+        
+        results = []
+        for response, sentiment_scores, entities in zip(responses, all_sentiment_scores, all_entities):
+            try:
+                results.append(self._analyze_response(
+                    response['id'],
+                    response['ai_name'],
+                    response['query_text'],
+                    response['response_text'],
+                    sentiment_scores=sentiment_scores,
+                    entities=entities
+                ))
+            except Exception as e:
+                logger.error(f"Error processing response {response['id']}: {e}")
+        
+        # 解析結果と埋め込みはまとまりごとに保存・登録する
+        self._update_database(results)
+        self.vector_db.add_responses_bulk(
+            [str(result['response_id']) for result in results],
+            [result['processed_text'] for result in results],
+            [result['metadata'] for result in results]
+        )
+        
+        return len(results)
 
 def main():
     """テスト用メイン関数"""
@@ -395,7 +730,10 @@ def main():
     processor = DataProcessor(db_config, brand_keywords)
     
     # バッチ処理を実行
-    processor.batch_process_unprocessed_responses()
+    try:
+        processor.batch_process_unprocessed_responses()
+    finally:
+        processor.close()
 
 if __name__ == "__main__":
     main()
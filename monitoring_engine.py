@@ -1,14 +1,17 @@
 import os
-import time
+import asyncio
 import json
 import logging
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import psycopg2
 from psycopg2.extras import RealDictCursor
-import openai
+from psycopg2.pool import ThreadedConnectionPool
+from openai import AsyncOpenAI
 import google.generativeai as genai
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
+from aiolimiter import AsyncLimiter
 import requests
 from bs4 import BeautifulSoup
 from selenium import webdriver
@@ -18,6 +21,7 @@ from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
@@ -25,15 +29,44 @@ from apscheduler.triggers.interval import IntervalTrigger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# コネクションプールの最大接続数
+DB_POOL_MAX_CONNECTIONS = 8
+
+# 全AIプロバイダー共通のAPI呼び出しレート（API_RATE_PERIOD_SECONDS秒あたりAPI_RATE_LIMIT回）
+API_RATE_LIMIT = 3
+API_RATE_PERIOD_SECONDS = 2
+
+# Perplexityの応答待ち（最大待機秒数と、応答が出揃ったとみなす最小文字数）
+PERPLEXITY_RESPONSE_TIMEOUT_SECONDS = 15
+PERPLEXITY_MIN_RESPONSE_LENGTH = 50
+
+# 最後の応答ブロックのテキストを1回のスクリプト実行で取得
+_LAST_PROSE_TEXT_SCRIPT = (
+    "const elements = document.querySelectorAll('.prose');"
+    "return elements.length ? elements[elements.length - 1].innerText : null;"
+)
+
 class DatabaseManager:
     """データベース接続とクエリ管理"""
     
     def __init__(self, db_config: Dict[str, str]):
         self.db_config = db_config
-        
+        self.pool = ThreadedConnectionPool(1, DB_POOL_MAX_CONNECTIONS, **db_config)
+    
+    @contextmanager
     def get_connection(self):
-        """データベース接続を取得"""
-        return psycopg2.connect(**self.db_config)
+        """プールからデータベース接続を借り、トランザクション終了後に返却"""
+        conn = self.pool.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            # サーバー側で切断された接続はプールに戻さず破棄
+            self.pool.putconn(conn, close=bool(conn.closed))
+    
+    def close(self):
+        """プール内の全接続を閉じる"""
+        self.pool.closeall()
     
     def insert_ai_response(self, ai_name: str, query_text: str, response_text: str, 
                           sentiment: Optional[str] = None, topics: Optional[List[str]] = None,
@@ -49,7 +82,7 @@ class DatabaseManager:
                 return cursor.fetchone()[0]
 
 class AICollector:
-    """AI APIからデータを収集するクラス"""
+    """AI APIからデータを収集するクラス（async with の中でクエリを送信する）"""
     
     def __init__(self, db_manager: DatabaseManager):
         self.db_manager = db_manager
@@ -59,57 +92,80 @@ class AICollector:
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         self.anthropic_api_key = os.getenv('ANTHROPIC_API_KEY')
         
-        # APIクライアント初期化
-        if self.openai_api_key:
-            openai.api_key = self.openai_api_key
         if self.gemini_api_key:
             genai.configure(api_key=self.gemini_api_key)
+        
+        # 非同期クライアントはイベントループに紐づくため __aenter__ で作成する
+        self.openai_client = None
+        self.anthropic_client = None
+        self.rate_limiter = None
+    
+    async def __aenter__(self):
+        """非同期APIクライアントとレート制限を初期化"""
+        if self.openai_api_key:
+            self.openai_client = AsyncOpenAI(api_key=self.openai_api_key)
         if self.anthropic_api_key:
-            self.anthropic_client = Anthropic(api_key=self.anthropic_api_key)
+            self.anthropic_client = AsyncAnthropic(api_key=self.anthropic_api_key)
+        self.rate_limiter = AsyncLimiter(API_RATE_LIMIT, API_RATE_PERIOD_SECONDS)
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """非同期APIクライアントを閉じる"""
+        for client in (self.openai_client, self.anthropic_client):
+            if client:
+                await client.close()
+        
+        self.openai_client = None
+        self.anthropic_client = None
     
-    def query_chatgpt(self, query: str) -> Optional[str]:
+    async def query_chatgpt(self, query: str) -> Optional[str]:
         """ChatGPT APIにクエリを送信"""
         try:
             if not self.openai_api_key:
                 logger.warning("OpenAI API key not found")
                 return None
-                
-            response = openai.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": query}],
-                max_tokens=1000
-            )
+            
+            async with self.rate_limiter:
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[{"role": "user", "content": query}],
+                    max_tokens=1000
+                )
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"ChatGPT API error: {e}")
             return None
     
-    def query_gemini(self, query: str) -> Optional[str]:
+    async def query_gemini(self, query: str) -> Optional[str]:
         """Gemini APIにクエリを送信"""
         try:
             if not self.gemini_api_key:
                 logger.warning("Gemini API key not found")
                 return None
-                
+            
             model = genai.GenerativeModel('gemini-pro')
-            response = model.generate_content(query)
+            async with self.rate_limiter:
+                # generate_content_asyncの非同期クライアントは最初のイベントループに紐づいて再利用され、
+                # サイクルごとにasyncio.runで作り直すループでは失敗するため、同期APIをスレッドで実行する
+                response = await asyncio.to_thread(model.generate_content, query)
             return response.text
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
             return None
     
-    def query_claude(self, query: str) -> Optional[str]:
+    async def query_claude(self, query: str) -> Optional[str]:
         """Claude APIにクエリを送信"""
         try:
             if not self.anthropic_api_key:
                 logger.warning("Anthropic API key not found")
                 return None
-                
-            response = self.anthropic_client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=1000,
-                messages=[{"role": "user", "content": query}]
-            )
+            
+            async with self.rate_limiter:
+                response = await self.anthropic_client.messages.create(
+                    model="claude-3-sonnet-20240229",
+                    max_tokens=1000,
+                    messages=[{"role": "user", "content": query}]
+                )
             return response.content[0].text
         except Exception as e:
             logger.error(f"Claude API error: {e}")
@@ -138,6 +194,18 @@ class WebScraper:
         """ドライバーを閉じる"""
         if self.driver:
             self.driver.quit()
+            self.driver = None
+    
+    def _get_last_response_text(self) -> Optional[str]:
+        """ページ上の最後の応答テキストを取得"""
+        return self.driver.execute_script(_LAST_PROSE_TEXT_SCRIPT)
+    
+    def _response_text_ready(self, driver) -> Optional[str]:
+        """応答テキストが出揃っていれば返す（WebDriverWaitの待機条件）"""
+        text = self._get_last_response_text()
+        if text and len(text) > PERPLEXITY_MIN_RESPONSE_LENGTH:
+            return text
+        return None
     
     def scrape_perplexity(self, query: str) -> Optional[str]:
         """Perplexity AIから応答を取得"""
@@ -157,15 +225,14 @@ class WebScraper:
             submit_button = self.driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
             submit_button.click()
             
-            # 応答を待機
-            time.sleep(5)
-            
-            # 応答テキストを取得
-            response_elements = self.driver.find_elements(By.CSS_SELECTOR, ".prose")
-            if response_elements:
-                return response_elements[-1].text
-            
-            return None
+            # 応答テキストが一定の長さになるまで待機（固定時間は待たない）
+            try:
+                return WebDriverWait(self.driver, PERPLEXITY_RESPONSE_TIMEOUT_SECONDS).until(
+                    self._response_text_ready
+                )
+            except TimeoutException:
+                # 時間内に出揃わなかった場合はその時点のテキストを返す
+                return self._get_last_response_text() or None
         except Exception as e:
             logger.error(f"Perplexity scraping error: {e}")
             return None
@@ -204,33 +271,37 @@ class MonitoringEngine:
         
     def run_monitoring_cycle(self):
         """1回の監視サイクルを実行"""
+        asyncio.run(self._run_monitoring_cycle_async())
+    
+    @staticmethod
+    async def _query_ai(ai_name: str, request) -> Tuple[str, Optional[str]]:
+        """AIへの問い合わせ結果をAI名と組にして返す"""
+        return ai_name, await request
+    
+    async def _run_monitoring_cycle_async(self):
+        """監視サイクル本体（各AIへの問い合わせを並行して送信）"""
         logger.info("Starting monitoring cycle...")
         
         queries = self.query_generator.generate_queries()
         
-        for query in queries[:5]:  # テスト用に最初の5つのクエリのみ実行
-            logger.info(f"Processing query: {query}")
-            
-            # ChatGPT
-            chatgpt_response = self.ai_collector.query_chatgpt(query)
-            if chatgpt_response:
-                self.db_manager.insert_ai_response("ChatGPT", query, chatgpt_response)
-                logger.info("ChatGPT response saved")
-            
-            # Gemini
-            gemini_response = self.ai_collector.query_gemini(query)
-            if gemini_response:
-                self.db_manager.insert_ai_response("Gemini", query, gemini_response)
-                logger.info("Gemini response saved")
-            
-            # Claude
-            claude_response = self.ai_collector.query_claude(query)
-            if claude_response:
-                self.db_manager.insert_ai_response("Claude", query, claude_response)
-                logger.info("Claude response saved")
-            
-            # レート制限を避けるため少し待機
-            time.sleep(2)
+        async with self.ai_collector:
+            for query in queries[:5]:  # テスト用に最初の5つのクエリのみ実行
+                logger.info(f"Processing query: {query}")
+                
+                # ChatGPT・Gemini・Claudeは互いに独立しているため同時に問い合わせ、
+                # 応答が返った順に保存する（呼び出し間隔は共通のレート制限で調整）
+                pending = [
+                    self._query_ai("ChatGPT", self.ai_collector.query_chatgpt(query)),
+                    self._query_ai("Gemini", self.ai_collector.query_gemini(query)),
+                    self._query_ai("Claude", self.ai_collector.query_claude(query))
+                ]
+                
+                for completed in asyncio.as_completed(pending):
+                    ai_name, response = await completed
+                    if response:
+                        # DBへの書き込みはブロッキングのため、イベントループ外のスレッドで実行
+                        await asyncio.to_thread(self.db_manager.insert_ai_response, ai_name, query, response)
+                        logger.info(f"{ai_name} response saved")
         
         logger.info("Monitoring cycle completed")
 
@@ -271,6 +342,9 @@ def main():
     except KeyboardInterrupt:
         logger.info("Monitoring stopped by user")
         scheduler.shutdown()
+    finally:
+        engine.web_scraper.close_driver()
+        engine.db_manager.close()
 
 if __name__ == "__main__":
     main()
@@ -19,4 +19,5 @@ CREATE TABLE IF NOT EXISTS brand_mentions (
     timestamp TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
-
+CREATE INDEX IF NOT EXISTS idx_ai_responses_timestamp ON ai_responses(timestamp);
+CREATE INDEX IF NOT EXISTS idx_brand_mentions_ai_response_id ON brand_mentions(ai_response_id);
@@ -4,23 +4,52 @@ AI Brand Monitoring System - 統合テストスクリプト
 """
 
 import os
+import io
+import ast
+import csv
 import sys
 import time
+import socket
 import logging
+import argparse
+import importlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from typing import Dict, List, Optional
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+
+try:
+    import pytest
+except ImportError:  # pytestが無くてもスクリプトとして実行できるようにする
+    pytest = None
 
 # ログ設定
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# テスト用コネクションプールの接続数
+TEST_POOL_MIN_CONNECTIONS = 2
+TEST_POOL_MAX_CONNECTIONS = 4
+
+# --full指定時にStreamlitサーバーを起動するポートと、起動を待つ最大秒数
+STREAMLIT_TEST_PORT = 8502
+STREAMLIT_STARTUP_TIMEOUT_SECONDS = 10
+
+# ダッシュボードをプロセス内で実行する際の1回の描画の最大秒数
+STREAMLIT_APPTEST_TIMEOUT_SECONDS = 30
+
 class SystemTester:
     """システム統合テストクラス"""
     
-    def __init__(self):
+    def __init__(self, exact: bool = False, full: bool = False):
+        # exact=Trueの場合、件数をCOUNT(*)で正確に数える（既定は統計情報の推定値）
+        self.exact = exact
+        # full=Trueの場合、Streamlitサーバーを実際に起動して確認する
+        self.full = full
         self.db_config = {
             'host': 'localhost',
             'database': 'ai_monitoring',
@@ -28,17 +57,53 @@ class SystemTester:
             'password': 'manus_password'
         }
         self.test_results = []
+        # DB接続が不要なテストだけを実行する場合に備え、プールは初回利用時に作成
+        self.pool = None
+    
+    def _get_pool(self):
+        """コネクションプールを取得（初回呼び出し時に作成）"""
+        if self.pool is None:
+            self.pool = ThreadedConnectionPool(TEST_POOL_MIN_CONNECTIONS, TEST_POOL_MAX_CONNECTIONS, **self.db_config)
+        return self.pool
+    
+    @contextmanager
+    def _conn(self):
+        """プールから接続を借りてトランザクション終了後に返却"""
+        pool = self._get_pool()
+        conn = pool.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            # サーバー側で切断された接続はプールに戻さず破棄
+            pool.putconn(conn, close=bool(conn.closed))
+    
+    @contextmanager
+    def _txn(self):
+        """プールから接続を借り、終了時に必ずロールバックして返却（テストデータをテーブルに残さない）"""
+        pool = self._get_pool()
+        conn = pool.getconn()
+        try:
+            yield conn
+        finally:
+            if not conn.closed:
+                conn.rollback()
+            pool.putconn(conn, close=bool(conn.closed))
+    
+    def close(self):
+        """プール内の全接続を閉じる"""
+        if self.pool is not None:
+            self.pool.closeall()
+            self.pool = None
     
     def test_database_connection(self) -> bool:
         """データベース接続テスト"""
         logger.info("Testing database connection...")
         try:
-            with psycopg2.connect(**self.db_config) as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute("SELECT version();")
-                    version = cursor.fetchone()[0]
-                    logger.info(f"Database connected successfully: {version}")
-                    return True
+            with self._conn() as conn:
+                # サーバーバージョンは接続確立時に取得済みのため、クエリは送信しない
+                logger.info(f"Database connected successfully: server version {conn.server_version}")
+                return True
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             return False
@@ -47,21 +112,19 @@ class SystemTester:
         """データベーススキーマテスト"""
         logger.info("Testing database schema...")
         try:
-            with psycopg2.connect(**self.db_config) as conn:
+            with self._conn() as conn:
                 with conn.cursor() as cursor:
-                    # 必要なテーブルの存在確認
+                    # 必要なテーブルの存在を1回のクエリでまとめて確認
                     required_tables = ['ai_responses', 'brand_mentions']
                     
+                    cursor.execute("""
+                        SELECT table_name FROM information_schema.tables 
+                        WHERE table_name = ANY(%s)
+                    """, (required_tables,))
+                    
+                    found_tables = {row[0] for row in cursor.fetchall()}
                     for table in required_tables:
-                        cursor.execute("""
-                            SELECT EXISTS (
-                                SELECT FROM information_schema.tables 
-                                WHERE table_name = %s
-                            );
-                        """, (table,))
-                        
-                        exists = cursor.fetchone()[0]
-                        if not exists:
+                        if table not in found_tables:
                             logger.error(f"Required table '{table}' does not exist")
                             return False
                         
@@ -121,58 +184,113 @@ class SystemTester:
         """サンプルデータ挿入テスト"""
         logger.info("Testing sample data insertion...")
         try:
-            with psycopg2.connect(**self.db_config) as conn:
+            # 挿入できることだけを確認し、最後にロールバックする（繰り返し実行してもテーブルが膨らまない）
+            with self._txn() as conn:
                 with conn.cursor() as cursor:
-                    # サンプルデータを挿入
-                    cursor.execute("""
-                        INSERT INTO ai_responses (ai_name, query_text, response_text, response_sentiment)
-                        VALUES (%s, %s, %s, %s)
-                        RETURNING id
-                    """, (
+                    # サンプルデータを挿入（複数行でも1文で送信し、採番されたIDをまとめて受け取る）
+                    sample_responses = [(
                         "TestAI",
                         "Pythonについて教えてください",
                         "Pythonは素晴らしいプログラミング言語です。",
                         "positive"
-                    ))
-                    
-                    response_id = cursor.fetchone()[0]
+                    )]
+                    response_ids = [row[0] for row in execute_values(cursor, """
+                        INSERT INTO ai_responses (ai_name, query_text, response_text, response_sentiment)
+                        VALUES %s
+                        RETURNING id
+                    """, sample_responses, fetch=True)]
                     
                     # ブランド言及データを挿入
-                    cursor.execute("""
+                    execute_values(cursor, """
                         INSERT INTO brand_mentions (ai_response_id, brand_name, mention_type, sentiment, context)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (
-                        response_id,
-                        "Python",
-                        "direct",
-                        "positive",
-                        "Pythonは素晴らしいプログラミング言語です。"
-                    ))
+                        VALUES %s
+                    """, [
+                        (response_id, "Python", "direct", "positive", response_text)
+                        for response_id, (_, _, response_text, _) in zip(response_ids, sample_responses)
+                    ])
                     
-                    conn.commit()
-                    logger.info("Sample data inserted successfully")
+                    logger.info("Sample data inserted successfully (rolled back)")
                     return True
                     
         except Exception as e:
             logger.error(f"Sample data insertion failed: {e}")
             return False
     
+    def bulk_insert_samples(self, n: int) -> int:
+        """負荷確認用のサンプル応答とブランド言及をCOPYでまとめて挿入"""
+        ai_names = ["ChatGPT", "Gemini", "Claude"]
+        sentiments = ["positive", "neutral", "negative"]
+        
+        with self._conn() as conn:
+            with conn.cursor() as cursor:
+                # ブランド言及から参照するため、応答のIDをシーケンスから先にまとめて確保
+                cursor.execute("""
+                    SELECT nextval(pg_get_serial_sequence('ai_responses', 'id'))
+                    FROM generate_series(1, %s)
+                """, (n,))
+                response_ids = [row[0] for row in cursor.fetchall()]
+                
+                responses = [
+                    (
+                        response_id,
+                        ai_names[i % len(ai_names)],
+                        "Pythonについて教えてください",
+                        f"Pythonは素晴らしいプログラミング言語です。（サンプル{i + 1}）",
+                        sentiments[i % len(sentiments)]
+                    )
+                    for i, response_id in enumerate(response_ids)
+                ]
+                self._copy_rows(cursor, "ai_responses (id, ai_name, query_text, response_text, response_sentiment)", responses)
+                
+                self._copy_rows(cursor, "brand_mentions (ai_response_id, brand_name, mention_type, sentiment, context)", [
+                    (response_id, "Python", "direct", sentiment, response_text)
+                    for response_id, _, _, response_text, sentiment in responses
+                ])
+        
+        logger.info(f"Inserted {n} sample responses and brand mentions")
+        return n
+    
+    @staticmethod
+    def _copy_rows(cursor, table_columns: str, rows: List[tuple]):
+        """行をメモリ上のCSVにまとめ、COPY FROM STDINで一括挿入"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table_columns} FROM STDIN WITH (FORMAT csv)", buffer)
+    
     def test_data_retrieval(self) -> bool:
         """データ取得テスト"""
         logger.info("Testing data retrieval...")
         try:
-            with psycopg2.connect(**self.db_config) as conn:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    # AI応答データの取得
-                    cursor.execute("SELECT COUNT(*) as count FROM ai_responses")
-                    response_count = cursor.fetchone()['count']
-                    
-                    # ブランド言及データの取得
-                    cursor.execute("SELECT COUNT(*) as count FROM brand_mentions")
-                    mention_count = cursor.fetchone()['count']
-                    
-                    logger.info(f"Retrieved {response_count} AI responses and {mention_count} brand mentions")
-                    return True
+            with self._conn() as conn:
+                # 統計情報の推定件数を1回のカタログ参照で取得（テーブル全体を走査しない）
+                estimated_counts = {}
+                if not self.exact:
+                    with conn.cursor() as cursor:
+                        cursor.execute("""
+                            SELECT relname, reltuples::bigint FROM pg_class
+                            WHERE relname = ANY(%s) AND relkind IN ('r', 'p')
+                        """, (['ai_responses', 'brand_mentions'],))
+                        estimated_counts = dict(cursor.fetchall())
+                
+                # 一度もANALYZEされていないテーブル（推定値が負または未取得）は正確に数える
+                if min(estimated_counts.get('ai_responses', -1), estimated_counts.get('brand_mentions', -1)) < 0:
+                    with conn.cursor() as cursor:
+                        # AI応答データとブランド言及データの件数を1回のクエリで取得
+                        cursor.execute("""
+                            SELECT 'ai_responses', COUNT(*) FROM ai_responses
+                            UNION ALL
+                            SELECT 'brand_mentions', COUNT(*) FROM brand_mentions
+                        """)
+                        counts = dict(cursor.fetchall())
+                        response_count = counts['ai_responses']
+                        mention_count = counts['brand_mentions']
+                else:
+                    response_count = estimated_counts['ai_responses']
+                    mention_count = estimated_counts['brand_mentions']
+                
+                logger.info(f"Retrieved {response_count} AI responses and {mention_count} brand mentions")
+                return True
                     
         except Exception as e:
             logger.error(f"Data retrieval failed: {e}")
@@ -182,9 +300,10 @@ class SystemTester:
         """テキスト解析機能テスト"""
         logger.info("Testing text analyzer...")
         try:
-            from data_processor import TextAnalyzer
+            from data_processor import get_text_analyzer
             
-            analyzer = TextAnalyzer()
+            # モデルの読み込みはプロセス内で1回だけ（データ処理エンジンと共有）
+            analyzer = get_text_analyzer()
             
             # 感情分析テスト
             test_text = "This is a great product!"
@@ -204,59 +323,125 @@ class SystemTester:
     def test_streamlit_dashboard(self) -> bool:
         """Streamlitダッシュボードテスト"""
         logger.info("Testing Streamlit dashboard...")
+        if self.full:
+            return self._run_streamlit_server()
+        
         try:
-            # Streamlitアプリが正常に起動するかテスト
-            result = subprocess.run([
-                'streamlit', 'run', 'dashboard.py', '--server.headless', 'true', '--server.port', '8502'
-            ], capture_output=True, text=True, timeout=10)
+            try:
+                from streamlit.testing.v1 import AppTest
+            except ImportError:
+                AppTest = None
             
-            if result.returncode == 0 or "started" in result.stderr.lower():
-                logger.info("Streamlit dashboard can be started")
-                return True
-            else:
-                logger.error(f"Streamlit dashboard failed to start: {result.stderr}")
-                return False
+            if AppTest is not None:
+                # サーバーは起動せず、ダッシュボードをプロセス内でヘッドレス実行
+                app = AppTest.from_file('dashboard.py', default_timeout=STREAMLIT_APPTEST_TIMEOUT_SECONDS)
+                app.run()
+                
+                if app.exception:
+                    logger.error(f"Streamlit dashboard raised an exception: {app.exception[0].message}")
+                    return False
                 
-        except subprocess.TimeoutExpired:
-            logger.info("Streamlit dashboard started successfully (timeout as expected)")
+                logger.info("Streamlit dashboard rendered successfully")
+                return True
+            
+            # AppTestが使えない古いStreamlitでは、スクリプトの構文とStreamlit設定の読み込みのみ確認
+            with open('dashboard.py', encoding='utf-8') as f:
+                ast.parse(f.read(), filename='dashboard.py')
+            
+            from streamlit.web.bootstrap import load_config_options
+            load_config_options({})
+            
+            logger.info("Streamlit dashboard script is valid")
             return True
         except Exception as e:
             logger.error(f"Streamlit dashboard test failed: {e}")
             return False
     
+    def _run_streamlit_server(self) -> bool:
+        """Streamlitサーバーを実際に起動して確認"""
+        process = None
+        try:
+            # Streamlitアプリが正常に起動するかテスト（ポートが開いた時点で成功とする）
+            process = subprocess.Popen([
+                'streamlit', 'run', 'dashboard.py', '--server.headless', 'true',
+                '--server.port', str(STREAMLIT_TEST_PORT)
+            ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            
+            deadline = time.monotonic() + STREAMLIT_STARTUP_TIMEOUT_SECONDS
+            while time.monotonic() < deadline:
+                if process.poll() is not None:
+                    logger.error(f"Streamlit dashboard failed to start: exited with code {process.returncode}")
+                    return False
+                
+                try:
+                    with socket.create_connection(('127.0.0.1', STREAMLIT_TEST_PORT), timeout=0.25):
+                        logger.info("Streamlit dashboard started successfully")
+                        return True
+                except OSError:
+                    time.sleep(0.25)
+            
+            logger.error(f"Streamlit dashboard did not start within {STREAMLIT_STARTUP_TIMEOUT_SECONDS}s")
+            return False
+                
+        except Exception as e:
+            logger.error(f"Streamlit dashboard test failed: {e}")
+            return False
+        finally:
+            if process is not None and process.poll() is None:
+                process.terminate()
+                process.wait()
+    
     def run_all_tests(self) -> Dict[str, bool]:
         """全てのテストを実行"""
         logger.info("Starting comprehensive system tests...")
         
+        # (テスト名, テスト関数, 依存するテスト名) — 依存先は必ず前に並べる
         tests = [
-            ("Database Connection", self.test_database_connection),
-            ("Database Schema", self.test_database_schema),
-            ("Monitoring Engine Import", self.test_monitoring_engine_import),
-            ("Data Processor Import", self.test_data_processor_import),
-            ("Dashboard Import", self.test_dashboard_import),
-            ("Alert System Import", self.test_alert_system_import),
-            ("Sample Data Insertion", self.test_sample_data_insertion),
-            ("Data Retrieval", self.test_data_retrieval),
-            ("Text Analyzer", self.test_text_analyzer),
-            ("Streamlit Dashboard", self.test_streamlit_dashboard)
+            ("Database Connection", self.test_database_connection, []),
+            ("Database Schema", self.test_database_schema, ["Database Connection"]),
+            ("Monitoring Engine Import", self.test_monitoring_engine_import, []),
+            ("Data Processor Import", self.test_data_processor_import, []),
+            ("Dashboard Import", self.test_dashboard_import, []),
+            ("Alert System Import", self.test_alert_system_import, []),
+            ("Sample Data Insertion", self.test_sample_data_insertion, ["Database Schema"]),
+            ("Data Retrieval", self.test_data_retrieval, ["Database Schema"]),
+            ("Text Analyzer", self.test_text_analyzer, ["Data Processor Import"]),
+            ("Streamlit Dashboard", self.test_streamlit_dashboard, ["Dashboard Import"])
         ]
         
         results = {}
         passed = 0
         total = len(tests)
         
-        for test_name, test_func in tests:
-            try:
-                result = test_func()
-                results[test_name] = result
-                if result:
-                    passed += 1
-                    logger.info(f"✅ {test_name}: PASSED")
-                else:
-                    logger.error(f"❌ {test_name}: FAILED")
-            except Exception as e:
-                results[test_name] = False
-                logger.error(f"❌ {test_name}: ERROR - {e}")
+        # モジュールのインポートテストは1つのワーカースレッドで順に実行し、DBテストと並行させる
+        # （同じ重いパッケージを複数スレッドから同時に初回インポートすると、デッドロックや初期化途中のモジュール参照が起こり得る）
+        import_tests = [(name, func) for name, func, _ in tests if name.endswith(" Import")]
+        importlib.invalidate_caches()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            import_futures = {name: executor.submit(func) for name, func in import_tests}
+            
+            for test_name, test_func, dependencies in tests:
+                # 依存先が失敗したテストは実行せずにスキップ（失敗として集計）
+                failed_dependencies = [dep for dep in dependencies if not results.get(dep)]
+                if failed_dependencies:
+                    results[test_name] = False
+                    logger.warning(f"⏭ {test_name}: SKIPPED (dep: {', '.join(failed_dependencies)})")
+                    continue
+                
+                try:
+                    if test_name in import_futures:
+                        result = import_futures[test_name].result()
+                    else:
+                        result = test_func()
+                    results[test_name] = result
+                    if result:
+                        passed += 1
+                        logger.info(f"✅ {test_name}: PASSED")
+                    else:
+                        logger.error(f"❌ {test_name}: FAILED")
+                except Exception as e:
+                    results[test_name] = False
+                    logger.error(f"❌ {test_name}: ERROR - {e}")
         
         # テスト結果サマリー
         logger.info(f"\n{'='*50}")
@@ -270,10 +455,27 @@ class SystemTester:
         
         return results
 
+if pytest is not None:
+    # pytest（pytest-xdist）からも実行できるよう、各テストを個別のテストケースとして公開
+    # 例: pytest -n auto test_system.py
+    @pytest.fixture(scope="module")
+    def system_tester():
+        """ワーカー内で共有するSystemTester"""
+        tester = SystemTester()
+        yield tester
+        tester.close()
+    
+    @pytest.mark.parametrize("test_method", [name for name in dir(SystemTester) if name.startswith("test_")])
+    def test_system_component(system_tester, test_method):
+        """SystemTesterの各テストをpytestのテストケースとして実行"""
+        assert getattr(system_tester, test_method)()
+
 class PerformanceOptimizer:
     """パフォーマンス最適化クラス"""
     
-    def __init__(self):
+    def __init__(self, deep: bool = False):
+        # deep=Trueの場合、統計情報の更新に加えてVACUUMも実行する
+        self.deep = deep
         self.db_config = {
             'host': 'localhost',
             'database': 'ai_monitoring',
@@ -285,39 +487,73 @@ class PerformanceOptimizer:
         """データベースインデックスを作成"""
         logger.info("Creating database indexes for performance optimization...")
         
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_ai_responses_timestamp ON ai_responses(timestamp);",
-            "CREATE INDEX IF NOT EXISTS idx_ai_responses_ai_name ON ai_responses(ai_name);",
-            "CREATE INDEX IF NOT EXISTS idx_ai_responses_sentiment ON ai_responses(response_sentiment);",
-            "CREATE INDEX IF NOT EXISTS idx_brand_mentions_brand_name ON brand_mentions(brand_name);",
-            "CREATE INDEX IF NOT EXISTS idx_brand_mentions_sentiment ON brand_mentions(sentiment);",
-            "CREATE INDEX IF NOT EXISTS idx_brand_mentions_ai_response_id ON brand_mentions(ai_response_id);"
-        ]
+        # 同じテーブルへのCONCURRENTLYは互いに待ち合うため、テーブル単位でまとめる
+        indexes = {
+            'ai_responses': [
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ai_responses_timestamp ON ai_responses(timestamp);",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ai_responses_ai_name ON ai_responses(ai_name);",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_ai_responses_sentiment ON ai_responses(response_sentiment);"
+            ],
+            'brand_mentions': [
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_brand_mentions_brand_name ON brand_mentions(brand_name);",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_brand_mentions_sentiment ON brand_mentions(sentiment);",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_brand_mentions_ai_response_id ON brand_mentions(ai_response_id);"
+            ]
+        }
         
         try:
-            with psycopg2.connect(**self.db_config) as conn:
-                with conn.cursor() as cursor:
-                    for index_sql in indexes:
-                        cursor.execute(index_sql)
-                        logger.info(f"Created index: {index_sql.split('idx_')[1].split(' ')[0]}")
-                    
-                    conn.commit()
-                    logger.info("Database indexes created successfully")
+            # テーブルごとに別の接続・スレッドで並行して作成
+            with ThreadPoolExecutor(max_workers=len(indexes)) as executor:
+                for future in [executor.submit(self._create_table_indexes, sqls) for sqls in indexes.values()]:
+                    future.result()
+            
+            logger.info("Database indexes created successfully")
                     
         except Exception as e:
             logger.error(f"Failed to create database indexes: {e}")
     
+    def _create_table_indexes(self, index_sqls: List[str]):
+        """1テーブル分のインデックスを専用の接続で順に作成"""
+        # CONCURRENTLYはトランザクション内で実行できないため、autocommitで1文ずつ実行する
+        # （テーブルへの書き込みをブロックせずにインデックスを作成できる）
+        conn = psycopg2.connect(**self.db_config)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                # インデックス作成中の各コミットでWALのディスク書き込みを待たない
+                cursor.execute("SET synchronous_commit = off")
+                
+                for index_sql in index_sqls:
+                    cursor.execute(index_sql)
+                    logger.info(f"Created index: {index_sql.split('idx_')[1].split(' ')[0]}")
+        finally:
+            conn.close()
+    
     def optimize_database_settings(self):
         """データベース設定を最適化"""
         logger.info("Optimizing database settings...")
         
+        # 両テーブルとも追記中心のため通常は統計情報の更新のみ行い、
+        # 不要行の回収は閾値を下げたautovacuumに任せる
         optimizations = [
-            "VACUUM ANALYZE ai_responses;",
-            "VACUUM ANALYZE brand_mentions;"
+            "ALTER TABLE ai_responses SET (autovacuum_vacuum_scale_factor = 0.05, autovacuum_analyze_scale_factor = 0.02);",
+            "ALTER TABLE brand_mentions SET (autovacuum_vacuum_scale_factor = 0.05, autovacuum_analyze_scale_factor = 0.02);"
         ]
+        if self.deep:
+            optimizations += [
+                "VACUUM ANALYZE ai_responses;",
+                "VACUUM ANALYZE brand_mentions;"
+            ]
+        else:
+            optimizations += [
+                "ANALYZE ai_responses;",
+                "ANALYZE brand_mentions;"
+            ]
         
         try:
-            with psycopg2.connect(**self.db_config) as conn:
+            # VACUUMはトランザクション内で実行できないため、autocommitの接続で実行する
+            conn = psycopg2.connect(**self.db_config)
+            try:
                 conn.autocommit = True
                 with conn.cursor() as cursor:
                     for optimization in optimizations:
@@ -325,21 +561,45 @@ class PerformanceOptimizer:
                         logger.info(f"Executed: {optimization}")
                     
                     logger.info("Database optimization completed")
+            finally:
+                conn.close()
                     
         except Exception as e:
             logger.error(f"Failed to optimize database: {e}")
 
 def main():
     """メイン関数"""
+    parser = argparse.ArgumentParser(description="AI Brand Monitoring System - 統合テスト")
+    parser.add_argument("--samples", type=int, default=0,
+                        help="テスト後にCOPYで挿入するサンプル応答の件数（負荷確認用）")
+    parser.add_argument("--exact", action="store_true",
+                        help="データ取得テストで件数を推定値ではなくCOUNT(*)で数える")
+    parser.add_argument("--full", action="store_true",
+                        help="Streamlitダッシュボードテストでサーバーを実際に起動する")
+    parser.add_argument("--deep", action="store_true",
+                        help="最適化時にANALYZEだけでなくVACUUM ANALYZEを実行する")
+    args = parser.parse_args()
+    
     print("🚀 AI Brand Monitoring System - Integration Test & Optimization")
     print("=" * 60)
     
     # システムテストを実行
-    tester = SystemTester()
+    tester = SystemTester(exact=args.exact, full=args.full)
     test_results = tester.run_all_tests()
     
+    # 負荷確認用のサンプルデータを一括挿入
+    if args.samples > 0:
+        start_time = time.perf_counter()
+        try:
+            tester.bulk_insert_samples(args.samples)
+            logger.info(f"Sample insertion took {time.perf_counter() - start_time:.2f}s")
+        except Exception as e:
+            logger.error(f"Bulk sample insertion failed: {e}")
+    
+    tester.close()
+    
     # パフォーマンス最適化を実行
-    optimizer = PerformanceOptimizer()
+    optimizer = PerformanceOptimizer(deep=args.deep)
     optimizer.create_database_indexes()
     optimizer.optimize_database_settings()
     